@@ -26,7 +26,10 @@ if not SECRET_KEY:
 if not ALGORITHM:
     logger.error("CRITICAL: ALGORITHM environment variable is NOT SET.")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# The bcrypt cost is configurable so tests can hash cheaply; production keeps 12 rounds
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
 # Create OAuth2 scheme for token auth - set auto_error to False to prevent automatic exceptions
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
@@ -38,10 +38,11 @@ engine = create_engine(
     DATABASE_URL, 
     echo=False,
     pool_pre_ping=True,  
-    pool_recycle=3600,    # Recycle connections every hour
-    pool_size=10,         # Reduced for Supabase limits
-    max_overflow=20,      # Reduced for Supabase limits
-    pool_timeout=30,      # Timeout for getting connection from pool
+    # Pool sizing can be tuned per deployment or script; defaults stay within Supabase limits
+    pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),  # Recycle connections every 30 minutes
+    pool_size=int(os.getenv("DB_POOL_SIZE", "10")),
+    max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "20")),
+    pool_timeout=int(os.getenv("DB_POOL_TIMEOUT", "30")),  # Timeout for getting connection from pool
     poolclass=QueuePool,  # Use QueuePool for better performance
     connect_args=connect_args
 )
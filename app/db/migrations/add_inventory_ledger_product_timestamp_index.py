@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""Migration script to add a (product_id, timestamp) index to the inventoryledger table"""
+
+from sqlalchemy import create_engine, text
+import os
+from dotenv import load_dotenv
+import logging
+import sys
+
+# Load environment variables
+load_dotenv()
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Database connection
+DATABASE_URL = os.getenv("DATABASE_URL")
+if not DATABASE_URL:
+    logger.error("DATABASE_URL environment variable is not set!")
+    print("Error: DATABASE_URL environment variable is not set!")
+    sys.exit(1)
+
+# Create engine
+engine = create_engine(DATABASE_URL)
+
+# Ledger history is read per product and date range; product_id had no index
+create_index_sql = """
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_inventoryledger_product_timestamp ON inventoryledger (product_id, timestamp);
+"""
+
+def run_migration():
+    """Execute the migration script"""
+    print("Starting database migration to add inventory ledger (product_id, timestamp) index...")
+    logger.info("Starting database migration to add inventory ledger (product_id, timestamp) index...")
+    
+    try:
+        # CONCURRENTLY cannot run inside a transaction block, but it builds the
+        # index without blocking writes to the table
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            print("Creating ix_inventoryledger_product_timestamp index...")
+            logger.info("Creating ix_inventoryledger_product_timestamp index...")
+            connection.execute(text(create_index_sql))
+            
+            print("Migration completed successfully!")
+            logger.info("Migration completed successfully")
+            return True
+            
+    except Exception as e:
+        error_msg = f"Error during migration: {str(e)}"
+        print(f"Error: {error_msg}")
+        logger.error(error_msg, exc_info=True)
+        return False
+
+if __name__ == "__main__":
+    success = run_migration()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""Migration script to add a composite (user_id, sku) index to the product table"""
+
+from sqlalchemy import create_engine, text
+import os
+from dotenv import load_dotenv
+import logging
+import sys
+
+# Load environment variables
+load_dotenv()
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Database connection
+DATABASE_URL = os.getenv("DATABASE_URL")
+if not DATABASE_URL:
+    logger.error("DATABASE_URL environment variable is not set!")
+    print("Error: DATABASE_URL environment variable is not set!")
+    sys.exit(1)
+
+# Create engine
+engine = create_engine(DATABASE_URL)
+
+# Tenant-scoped product queries filter on user_id first, which had no index
+create_index_sql = """
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ix_product_user_sku ON product (user_id, sku);
+"""
+
+def run_migration():
+    """Execute the migration script"""
+    print("Starting database migration to add product (user_id, sku) index...")
+    logger.info("Starting database migration to add product (user_id, sku) index...")
+    
+    try:
+        # CONCURRENTLY cannot run inside a transaction block, but it builds the
+        # index without blocking writes to the table
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            print("Creating ix_product_user_sku index...")
+            logger.info("Creating ix_product_user_sku index...")
+            connection.execute(text(create_index_sql))
+            
+            print("Migration completed successfully!")
+            logger.info("Migration completed successfully")
+            return True
+            
+    except Exception as e:
+        error_msg = f"Error during migration: {str(e)}"
+        print(f"Error: {error_msg}")
+        logger.error(error_msg, exc_info=True)
+        return False
+
+if __name__ == "__main__":
+    success = run_migration()
+    sys.exit(0 if success else 1)
@@ -1,6 +1,7 @@
 from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 import time
 import logging
@@ -15,7 +16,10 @@ from app.routers.supabase_auth import router as supabase_auth_router
 from app.routers.rules import router as rules_router
 from app.routers.inventory import router as inventory_router
 from app.routers.connectors import router as connectors_router
+from app.services.connector_service import cancel_background_syncs, close_csv_parse_pool, close_http_session
+from app.services.email_service import close_sendgrid_client
 import os
+import sys
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -47,6 +51,16 @@ async def lifespan(app: FastAPI):
         task.cancel()
     await asyncio.gather(*background_tasks, return_exceptions=True)
     
+    # Stop connector initial syncs before the HTTP session and DB pool they use go away
+    await cancel_background_syncs()
+    
+    # Close pooled provider and SendGrid API connections
+    await close_http_session()
+    await close_sendgrid_client()
+    
+    # Stop the CSV parsing worker processes so they don't outlive the app
+    close_csv_parse_pool()
+    
     # Close database connections
     engine.dispose()
     logger.info("Application shutdown complete")
@@ -76,7 +90,9 @@ app = FastAPI(
     title="Steadi API",
     description="API for Steadi - AI Agent for Small Businesses",
     version="0.1.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    # Encode JSON responses with orjson (already a dependency) instead of stdlib json
+    default_response_class=ORJSONResponse
 )
 
 # Add GZip compression middleware
@@ -151,4 +167,17 @@ async def health_check():
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run("app.main:app", host="0.0.0.0", port=port, reload=False)
+    # Auto-reload is for local development only; it forks a supervisor and watches the tree
+    reload = os.getenv("UVICORN_RELOAD", "0") == "1"
+    # Reload mode always runs a single worker
+    workers = 1 if reload else int(os.getenv("UVICORN_WORKERS", "1"))
+    uvicorn.run(
+        "app.main:app",
+        host="0.0.0.0",
+        port=port,
+        reload=reload,
+        workers=workers,
+        # uvloop and httptools are pinned in requirements.txt (uvloop is skipped on Windows)
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+    )
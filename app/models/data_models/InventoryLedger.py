@@ -1,5 +1,6 @@
 from typing import Optional, TYPE_CHECKING
 from sqlmodel import Field, Relationship, SQLModel
+from sqlalchemy import Index
 from datetime import datetime
 from uuid import UUID, uuid4
 
@@ -8,6 +9,10 @@ if TYPE_CHECKING:
 
 class InventoryLedger(SQLModel, table=True):
     """Audit trail for all inventory changes"""
+    __table_args__ = (
+        # Per-product history filtered by date range
+        Index("ix_inventoryledger_product_timestamp", "product_id", "timestamp"),
+    )
     
     id: Optional[UUID] = Field(default_factory=uuid4, primary_key=True)
     product_id: UUID = Field(foreign_key="product.id")
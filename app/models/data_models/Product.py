@@ -1,5 +1,6 @@
 from typing import Optional, List, TYPE_CHECKING
 from sqlmodel import Field, Relationship, SQLModel
+from sqlalchemy import Index
 from datetime import datetime
 from uuid import UUID, uuid4
 from app.models.enums.AlertLevel import AlertLevel
@@ -14,6 +15,11 @@ if TYPE_CHECKING:
 
 class Product(SQLModel, table=True):
     """Inventory item with stock levels and thresholds"""
+    __table_args__ = (
+        # Tenant-scoped lookups lead with user_id
+        Index("ix_product_user_sku", "user_id", "sku", unique=True),
+    )
+    
     id: Optional[UUID] = Field(default_factory=uuid4, primary_key=True)
     sku: str = Field(unique=True, index=True)
     name: str = Field(index=True)
@@ -214,7 +214,7 @@ class AlertService:
             
         return result
     
-    def send_email_alerts(self, user_id: UUID) -> Dict[str, Any]:
+    async def send_email_alerts(self, user_id: UUID) -> Dict[str, Any]:
         """
         Send email alerts for products that need reordering.
         Implements rate limiting as per PRD requirements.
@@ -248,7 +248,7 @@ class AlertService:
             alert_counts = self.update_product_alert_levels(user_id)
             
             # Send email
-            email_sent = self.email_service.send_stock_alert_email(
+            email_sent = await self.email_service.send_stock_alert_email(
                 to_email=user.email,
                 user_name=user.email.split('@')[0].title(),  # Simple name extraction
                 alerts=alerts,
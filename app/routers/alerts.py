@@ -173,7 +173,7 @@ async def send_email_alerts(
 ):
     """Send email alerts for products that need reordering"""
     alert_service = AlertService(db)
-    result = alert_service.send_email_alerts(current_user.id)
+    result = await alert_service.send_email_alerts(current_user.id)
     
     if not result["success"]:
         if "rate limit" in result["message"].lower():
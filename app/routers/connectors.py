@@ -1,6 +1,9 @@
+import logging
+import orjson
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, status
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select
-from typing import List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 from uuid import UUID
 
 from app.db.database import get_db
@@ -19,6 +22,8 @@ from app.schemas.data_models.Connector import (
 )
 from app.services.connector_service import ConnectorService
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(
     prefix="/connectors",
     tags=["connectors"]
@@ -34,13 +39,13 @@ async def create_connector(
     
     # Check if connector for this provider already exists for this user
     existing_connector = db.exec(
-        select(Connector).where(
+        select(Connector.id).where(
             Connector.provider == connector_data.provider,
             Connector.created_by == current_user.id
-        )
+        ).limit(1)
     ).first()
     
-    if existing_connector:
+    if existing_connector is not None:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail=f"Connector for {connector_data.provider} already exists"
@@ -165,14 +170,14 @@ async def sync_connector(
     db: Session = Depends(get_db)
 ):
     """Manually trigger a sync for a connector"""
-    connector = db.exec(
-        select(Connector).where(
+    provider = db.exec(
+        select(Connector.provider).where(
             Connector.id == connector_id,
             Connector.created_by == current_user.id
         )
     ).first()
     
-    if not connector:
+    if provider is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Connector not found"
@@ -180,11 +185,11 @@ async def sync_connector(
     
     service = ConnectorService(db)
     
-    if connector.provider.value == "SHOPIFY":
+    if provider.value == "SHOPIFY":
         return await service.sync_shopify(connector_id)
-    elif connector.provider.value == "SQUARE":
+    elif provider.value == "SQUARE":
         return await service.sync_square(connector_id)
-    elif connector.provider.value == "LIGHTSPEED":
+    elif provider.value == "LIGHTSPEED":
         return await service.sync_lightspeed(connector_id)
     else:
         raise HTTPException(
@@ -199,14 +204,14 @@ async def test_connector(
     db: Session = Depends(get_db)
 ):
     """Test a connector connection"""
-    connector = db.exec(
-        select(Connector).where(
+    owned_connector = db.exec(
+        select(Connector.id).where(
             Connector.id == connector_id,
             Connector.created_by == current_user.id
-        )
+        ).limit(1)
     ).first()
     
-    if not connector:
+    if owned_connector is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Connector not found"
@@ -248,6 +253,78 @@ async def upload_csv(
         user_id=current_user.id
     )
 
+def _sse_event(event: Dict[str, Any]) -> bytes:
+    """Encode one import event as a server-sent event frame"""
+    return b"event: " + event["event"].encode() + b"\ndata: " + orjson.dumps(event, default=_sse_default) + b"\n\n"
+
+def _sse_default(value: Any) -> Any:
+    if isinstance(value, CSVUploadResponse):
+        return value.model_dump(mode="json")
+    raise TypeError
+
+@router.post("/csv/upload/stream")
+async def upload_csv_stream(
+    file: UploadFile = File(...),
+    sku_column: str = Form(...),
+    name_column: str = Form(...),
+    on_hand_column: str = Form(...),
+    cost_column: Optional[str] = Form(None),
+    supplier_name_column: Optional[str] = Form(None),
+    variant_column: Optional[str] = Form(None),
+    current_user: User = Depends(get_owner_user),
+    db: Session = Depends(get_db)
+):
+    """Upload a CSV and stream import progress as server-sent events (OWNER role required)"""
+    
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File must be a CSV"
+        )
+    
+    # The request-scoped session from get_db is closed before the streamed body is sent,
+    # so the import runs on its own session, closed when the stream finishes
+    stream_db = Session(bind=db.get_bind())
+    service = ConnectorService(stream_db)
+    events = service.import_csv_stream(
+        file=file,
+        sku_column=sku_column,
+        name_column=name_column,
+        on_hand_column=on_hand_column,
+        cost_column=cost_column,
+        supplier_name_column=supplier_name_column,
+        variant_column=variant_column,
+        user_id=current_user.id
+    )
+    
+    # Read and validate the upload before committing to a 200 stream so bad files still get a 400
+    try:
+        first_event = await events.__anext__()
+    except BaseException:
+        await events.aclose()
+        stream_db.close()
+        raise
+    
+    async def event_stream() -> AsyncIterator[bytes]:
+        try:
+            yield _sse_event(first_event)
+            async for event in events:
+                yield _sse_event(event)
+        except HTTPException as e:
+            yield _sse_event({"event": "error", "detail": e.detail})
+        except Exception as e:
+            logger.error("CSV import stream failed: %s", e)
+            yield _sse_event({"event": "error", "detail": "CSV import failed"})
+        finally:
+            await events.aclose()
+            stream_db.close()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # Test endpoint to verify owner-only access
 @router.get("/test/owner-only")
 async def test_owner_only(current_user: User = Depends(get_owner_user)):
@@ -268,13 +345,13 @@ async def initialize_shopify_oauth(
     
     # Check if Shopify connector already exists for this user
     existing_connector = db.exec(
-        select(Connector).where(
+        select(Connector.id).where(
             Connector.provider == "SHOPIFY",
             Connector.created_by == current_user.id
-        )
+        ).limit(1)
     ).first()
     
-    if existing_connector:
+    if existing_connector is not None:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Shopify connector already exists for this user"
@@ -310,13 +387,13 @@ async def initialize_square_oauth(
     
     # Check if Square connector already exists for this user
     existing_connector = db.exec(
-        select(Connector).where(
+        select(Connector.id).where(
             Connector.provider == "SQUARE",
             Connector.created_by == current_user.id
-        )
+        ).limit(1)
     ).first()
     
-    if existing_connector:
+    if existing_connector is not None:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Square connector already exists for this user"
@@ -345,13 +422,13 @@ async def initialize_lightspeed_oauth(
     
     # Check if Lightspeed connector already exists for this user
     existing_connector = db.exec(
-        select(Connector).where(
+        select(Connector.id).where(
             Connector.provider == "LIGHTSPEED",
             Connector.created_by == current_user.id
-        )
+        ).limit(1)
     ).first()
     
-    if existing_connector:
+    if existing_connector is not None:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Lightspeed connector already exists for this user"
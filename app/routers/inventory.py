@@ -4,8 +4,8 @@ from uuid import UUID, uuid4
 from datetime import datetime
 import logging
 
-from app.services.inventory_service import update_inventory, get_inventory, get_ledger
-from app.schemas.inventory import ProductCreate, ProductUpdate, ProductOut, InventoryResponse, InventoryLedgerOut
+from app.services.inventory_service import update_inventory, update_inventory_bulk, get_inventory, get_ledger
+from app.schemas.inventory import ProductCreate, ProductUpdate, ProductOut, InventoryAdjustment, InventoryResponse, InventoryLedgerOut
 from app.models.data_models.Product import Product
 from app.models.data_models.Supplier import Supplier
 from app.db.database import get_db
@@ -166,7 +166,7 @@ async def read_inventory(
     user_ids = [user.id for user in users_in_org]
     logger.info(f"Fetching inventory for organization {current_user.organization_id} with {len(user_ids)} users")
     
-    return get_inventory(search, page, limit, user_ids=user_ids)
+    return get_inventory(session, search, page, limit, user_ids=user_ids)
 
 @router.get('/inventory/{sku}', response_model=ProductOut)
 async def read_product(
@@ -251,11 +251,13 @@ async def adjust_inventory(
     quantity_delta: int, 
     source: str = 'manual', 
     reference_id: Optional[str] = None,
+    session: Session = Depends(get_db),
     current_user: User = Depends(get_org_user_with_permissions("edit_products"))
 ):
     """Adjust inventory quantity with audit trail"""
     try:
         return update_inventory(
+            session,
             sku, 
             quantity_delta, 
             source, 
@@ -265,6 +267,23 @@ async def adjust_inventory(
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post('/inventory/adjust', response_model=List[ProductOut])
+async def adjust_inventory_bulk(
+    request: Request,
+    adjustments: List[InventoryAdjustment],
+    session: Session = Depends(get_db),
+    current_user: User = Depends(get_org_user_with_permissions("edit_products"))
+):
+    """Adjust several SKUs at once; all adjustments apply or none do"""
+    try:
+        return update_inventory_bulk(
+            session,
+            [(a.sku, a.quantity_delta, a.source, a.reference_id) for a in adjustments],
+            user_id=current_user.id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get('/inventory/ledger/{product_id}', response_model=List[InventoryLedgerOut])
 async def read_ledger(
     request: Request,
@@ -298,6 +317,7 @@ async def read_ledger(
         end_datetime = datetime.fromisoformat(end_date)
     
     return get_ledger(
+        session,
         product_id=product_id,
         start_date=start_datetime,
         end_date=end_datetime,
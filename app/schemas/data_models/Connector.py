@@ -31,6 +31,7 @@ class ConnectorSync(BaseModel):
     items_synced: int
     items_updated: int
     items_created: int
+    items_unchanged: int = 0
     sync_started_at: datetime
     sync_completed_at: Optional[datetime] = None
     errors: List[str] = []
@@ -47,6 +48,7 @@ class CSVUploadResponse(BaseModel):
     imported_items: int
     updated_items: int
     created_items: int
+    unchanged_items: int = 0
     errors: List[str] = []
     warnings: List[str] = []
     
@@ -22,6 +22,12 @@ class ProductUpdate(BaseModel):
     reorder_point: Optional[int] = Field(None, ge=0)
     safety_stock: Optional[int] = Field(None, ge=0)
 
+class InventoryAdjustment(BaseModel):
+    sku: str
+    quantity_delta: int
+    source: str = 'manual'
+    reference_id: Optional[str] = None
+
 class ProductOut(ProductBase):
     id: UUID
     alert_level: Optional[str] = None
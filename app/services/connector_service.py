@@ -1,21 +1,33 @@
+import asyncio
 import csv
 import io
 import aiohttp
 import logging
+import multiprocessing
+import numpy as np
+import orjson
 import re
 import os
-from datetime import datetime
-from typing import Dict, List, Optional, Any, Set
+import ssl
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from itertools import islice
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Any, Sequence, Set, Tuple
 from uuid import UUID
 from sqlmodel import Session, select
+from sqlalchemy import and_, bindparam, or_
+from sqlalchemy.orm import raiseload
+from sqlalchemy.orm.attributes import set_committed_value
 from fastapi import HTTPException, UploadFile
 
+from app.db.database import engine
 from app.models.data_models.Connector import Connector
 from app.models.data_models.Product import Product
 from app.models.data_models.Supplier import Supplier
 from app.models.data_models.InventoryLedger import InventoryLedger
 from app.models.data_models.Alert import Alert
 from app.models.data_models.AuditLog import AuditLog
+from app.models.data_models.User import User
 from app.models.enums.ConnectorProvider import ConnectorProvider
 from app.models.enums.AlertType import AlertType
 from app.models.enums.AuditAction import AuditAction
@@ -25,13 +37,340 @@ from app.schemas.data_models.Connector import (
     ConnectorTestResponse
 )
 
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pragma: no cover - pyarrow is optional, fall back to the csv module
+    pa = None
+    pa_csv = None
+
 logger = logging.getLogger(__name__)
 
+# Shopify pagination cursor, e.g.
+# <https://shop.myshopify.com/admin/api/2025-01/products.json?limit=250&page_info=xyz>; rel="next"
+_SHOPIFY_NEXT_PAGE_RE = re.compile(r'<[^>]*[?&]page_info=([^&>]+)[^>]*>;\s*rel="next"')
+
+# Plain decimal numbers that float() accepts without needing exception handling
+_NUM_RE = re.compile(r'^-?\d+(?:\.\d+)?$')
+
+# Characters dropped from supplier names when deriving placeholder contact emails
+_SUPPLIER_SLUG_TABLE = str.maketrans('', '', ' .')
+
+# SKUs per IN (...) lookup when upserting products in bulk
+PRODUCT_LOOKUP_BATCH_SIZE = 500
+
+# Shopify accepts up to 50 comma-separated inventory_item_ids per inventory_levels request
+SHOPIFY_INVENTORY_BATCH_SIZE = 50
+
+# Inventory batch requests in flight at once per Shopify sync
+SHOPIFY_MAX_CONNECTIONS = 4
+
+# Rows upserted between progress events of a streamed CSV import
+CSV_PROGRESS_INTERVAL = 500
+
+# Uploads at least this large are parsed in a worker process instead of on the event loop
+CSV_PARSE_OFFLOAD_BYTES = 1 << 20
+
+
+def _owner_scope(model):
+    """
+    Match rows of the :organization_id organization, else of :user_id, else any row
+    (backward compatibility), so all three lookups share one compiled statement
+    """
+    organization_id = bindparam("organization_id", type_=model.organization_id.type)
+    user_id = bindparam("user_id", type_=model.user_id.type)
+    return or_(
+        and_(organization_id.is_not(None), model.organization_id == organization_id),
+        and_(organization_id.is_(None), user_id.is_not(None), model.user_id == user_id),
+        and_(organization_id.is_(None), user_id.is_(None))
+    )
+
+
+# Existing products by SKU; the upsert only touches columns, so any relationship
+# access on these rows is an accidental N+1 and raises
+_PRODUCT_LOOKUP_STMT = select(Product).options(raiseload('*')).where(
+    Product.sku.in_(bindparam("skus", expanding=True)),
+    _owner_scope(Product)
+)
+
+_SUPPLIER_LOOKUP_STMT = select(Supplier).where(
+    Supplier.name.in_(bindparam("names", expanding=True)),
+    _owner_scope(Supplier)
+)
+
+_csv_parse_pool: Optional[ProcessPoolExecutor] = None
+
+# Initial syncs started after OAuth setup; referenced here so they aren't garbage collected mid-run
+_background_syncs: Set[asyncio.Task] = set()
+
+# One TLS context for every provider connection so certificates are loaded once and
+# session tickets can be reused; aiohttp only speaks HTTP/1.1, so only that is offered
+_SSL_CONTEXT = ssl.create_default_context()
+_SSL_CONTEXT.set_alpn_protocols(["http/1.1"])
+
+_http_session: Optional[aiohttp.ClientSession] = None
+_http_session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+async def get_http_session() -> aiohttp.ClientSession:
+    """Shared provider API session whose keep-alive pool is reused across requests"""
+    global _http_session, _http_session_loop
+    loop = asyncio.get_running_loop()
+    if _http_session is None or _http_session.closed or _http_session_loop is not loop:
+        _http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                ssl=_SSL_CONTEXT,
+                limit=100,
+                limit_per_host=20,
+                ttl_dns_cache=300,
+                keepalive_timeout=60
+            )
+        )
+        _http_session_loop = loop
+    return _http_session
+
+
+async def close_http_session():
+    """Close the shared provider API session (called on application shutdown)"""
+    global _http_session, _http_session_loop
+    if _http_session is not None and not _http_session.closed:
+        await _http_session.close()
+    _http_session = None
+    _http_session_loop = None
+
+
+async def cancel_background_syncs():
+    """Cancel initial syncs still running and wait for them (called on application shutdown)"""
+    tasks = list(_background_syncs)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _get_csv_parse_pool() -> ProcessPoolExecutor:
+    """Lazily create the process pool used for parsing large CSV uploads"""
+    global _csv_parse_pool
+    if _csv_parse_pool is None:
+        # spawn avoids forking a process that already runs an event loop and DB pool threads
+        _csv_parse_pool = ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+    return _csv_parse_pool
+
+
+def close_csv_parse_pool():
+    """Shut down the CSV parsing worker processes (called on application shutdown)"""
+    global _csv_parse_pool
+    if _csv_parse_pool is not None:
+        _csv_parse_pool.shutdown(wait=False, cancel_futures=True)
+    _csv_parse_pool = None
+
+
+async def _read_json(response: aiohttp.ClientResponse) -> Any:
+    """Decode a provider response body with orjson straight from the raw bytes"""
+    return orjson.loads(await response.read())
+
+
+def _normalize_string(value: str) -> str:
+    """Normalize string values (trim, case, etc.)"""
+    if not value:
+        return ""
+    # Trim whitespace and normalize case for names/suppliers
+    return value.strip()
+
+
+def _read_csv_header(content: bytes) -> List[str]:
+    """Return the column names from the first line of the CSV content"""
+    header_line = content.split(b'\n', 1)[0].decode('utf-8').rstrip('\r')
+    return next(csv.reader([header_line]), [])
+
+
+def _read_csv_rows(
+    content: bytes, fieldnames: List[str], columns: List[Optional[str]]
+) -> Tuple[List[str], Iterator[Sequence[str]]]:
+    """
+    Iterate over CSV rows as positional sequences, returning the column order
+    alongside the rows. Uses pyarrow's streaming reader when available so parsing
+    happens in C and only the mapped columns are materialized; falls back to csv.reader.
+    pyarrow rejects rows whose field count differs from the header, so on
+    ArrowInvalid the remaining rows are read with csv.reader, which pads them.
+    """
+    if pa_csv is None:
+        return fieldnames, _read_csv_rows_stdlib(content, len(fieldnames))
+    
+    wanted = [column for column in dict.fromkeys(columns) if column and column in fieldnames]
+    if not wanted:
+        return wanted, iter(())
+    
+    positions = [fieldnames.index(column) for column in wanted]
+    
+    def rows() -> Iterator[Sequence[str]]:
+        parsed = 0
+        try:
+            # Read everything as strings so value validation and error reporting stay per-row
+            reader = pa_csv.open_csv(
+                io.BytesIO(content),
+                read_options=pa_csv.ReadOptions(block_size=8 << 20),
+                convert_options=pa_csv.ConvertOptions(
+                    include_columns=wanted,
+                    column_types={column: pa.string() for column in wanted},
+                    strings_can_be_null=False
+                )
+            )
+            for batch in reader:
+                yield from zip(*(batch.column(column).to_pylist() for column in wanted))
+                parsed += batch.num_rows
+        except pa.ArrowInvalid as e:
+            logger.debug("Falling back to csv.reader after row %d: %s", parsed + 1, e)
+            # A failing batch yields nothing, so resume right after the last complete one
+            for row in islice(_read_csv_rows_stdlib(content, len(fieldnames)), parsed, None):
+                yield [row[position] for position in positions]
+    
+    return wanted, rows()
+
+
+def _read_csv_rows_stdlib(content: bytes, width: int) -> Iterator[Sequence[str]]:
+    """csv.reader fallback; skips the header and blank lines and pads short rows"""
+    csv_reader = csv.reader(io.StringIO(content.decode('utf-8')))
+    next(csv_reader, None)
+    for row in csv_reader:
+        if not row:
+            continue
+        if len(row) < width:
+            row += [""] * (width - len(row))
+        yield row
+
+
+def _parse_csv_rows(
+    content: bytes,
+    fieldnames: List[str],
+    sku_column: str,
+    name_column: str,
+    on_hand_column: str,
+    cost_column: Optional[str] = None,
+    supplier_name_column: Optional[str] = None,
+    variant_column: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Parse and validate CSV rows without touching the database.
+    Module-level so it can run in a worker process.
+    """
+    rows_data = []
+    row_count = 0
+    validation_errors = []
+    warnings = []
+    processed_skus = set()
+    
+    columns, csv_rows = _read_csv_rows(
+        content,
+        fieldnames,
+        [sku_column, name_column, on_hand_column, cost_column, supplier_name_column, variant_column]
+    )
+    
+    # Resolve column positions once instead of hashing column names on every row
+    column_index = {column: position for position, column in enumerate(columns)}
+    sku_idx = column_index[sku_column]
+    name_idx = column_index[name_column]
+    on_hand_idx = column_index[on_hand_column]
+    cost_idx = column_index.get(cost_column) if cost_column else None
+    variant_idx = column_index.get(variant_column) if variant_column else None
+    supplier_idx = column_index.get(supplier_name_column) if supplier_name_column else None
+    
+    # Bind hot-loop callables to locals
+    normalize = _normalize_string
+    is_plain_number = _NUM_RE.match
+    add_error = validation_errors.append
+    add_warning = warnings.append
+    add_row = rows_data.append
+    
+    for row_num, row in enumerate(csv_rows, start=2):  # Start at 2 for header
+        row_count += 1
+        
+        # Normalize and validate SKU
+        sku = normalize(row[sku_idx])
+        name = normalize(row[name_idx])
+        
+        if not sku or not name:
+            add_error(f"Row {row_num}: Missing SKU or name")
+            continue
+        
+        # Check for duplicate SKUs within the file
+        if sku in processed_skus:
+            add_error(f"Row {row_num}: Duplicate SKU '{sku}' found in CSV")
+            continue
+        
+        processed_skus.add(sku)
+        
+        # Validate and parse quantity; plain integers skip the float/exception path
+        on_hand_str = row[on_hand_idx].strip()
+        if on_hand_str.isdecimal():
+            on_hand = int(on_hand_str)
+        else:
+            try:
+                on_hand = int(float(on_hand_str)) if on_hand_str else 0
+            except (ValueError, TypeError):
+                add_error(f"Row {row_num}: Invalid quantity value '{row[on_hand_idx]}'")
+                continue
+            if on_hand < 0:
+                add_error(f"Row {row_num}: Quantity cannot be negative")
+                continue
+        
+        # Validate and parse cost
+        cost = 0.0
+        cost_str = row[cost_idx].strip() if cost_idx is not None else ""
+        if cost_str:
+            if is_plain_number(cost_str):
+                cost = float(cost_str)
+            else:
+                try:
+                    cost = float(cost_str)
+                except (ValueError, TypeError):
+                    add_warning(f"Row {row_num}: Invalid cost value for SKU '{sku}', using 0")
+                    cost = 0.0
+            if cost < 0:
+                add_warning(f"Row {row_num}: Negative cost for SKU '{sku}', using 0")
+                cost = 0.0
+        
+        # Get variant if provided
+        variant = None
+        if variant_idx is not None:
+            variant = normalize(row[variant_idx]) or None
+        
+        # Get supplier name
+        supplier_name = None
+        if supplier_idx is not None:
+            supplier_name = normalize(row[supplier_idx]) or None
+        
+        add_row({
+            'row_num': row_num,
+            'sku': sku,
+            'name': name,
+            'variant': variant,
+            'on_hand': on_hand,
+            'cost': cost,
+            'supplier_name': supplier_name
+        })
+    
+    return {
+        "rows_data": rows_data,
+        "row_count": row_count,
+        "validation_errors": validation_errors,
+        "warnings": warnings
+    }
+
 class ConnectorService:
     """Manages external system connections and synchronization"""
     
     def __init__(self, db: Session):
         self.db = db
+        # user_id -> organization_id, resolved at most once per service instance
+        self._user_org_cache: Dict[UUID, Optional[int]] = {}
+        # Audit entries queued by _create_audit_log until _flush_audits
+        self._pending_audits: List[AuditLog] = []
+        # Connection test per provider
+        self._test_handlers = {
+            ConnectorProvider.SHOPIFY: self._test_shopify_connection,
+            ConnectorProvider.SQUARE: self._test_square_connection,
+            ConnectorProvider.LIGHTSPEED: self._test_lightspeed_connection
+        }
     
     async def sync_shopify(self, connector_id: UUID) -> ConnectorSync:
         """Sync inventory from Shopify using Admin API"""
@@ -42,10 +381,11 @@ class ConnectorService:
         if connector.provider != ConnectorProvider.SHOPIFY:
             raise HTTPException(status_code=400, detail="Invalid provider for Shopify sync")
         
-        sync_started_at = datetime.utcnow()
+        sync_started_at = datetime.now(timezone.utc)
         items_synced = 0
         items_updated = 0
         items_created = 0
+        items_unchanged = 0
         errors = []
         
         try:
@@ -61,154 +401,193 @@ class ConnectorService:
             # Use the latest API version (2025-01)
             base_url = f"https://{shop_domain}/admin/api/2025-01"
             
-            async with aiohttp.ClientSession() as session:
-                # First, get all locations
-                locations_url = f"{base_url}/locations.json"
-                async with session.get(locations_url, headers=headers) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        raise HTTPException(
-                            status_code=response.status,
-                            detail=f"Shopify Locations API error: {error_text}"
-                        )
-                    
-                    locations_data = await response.json()
-                    locations = locations_data.get("locations", [])
-                    
-                    if not locations:
-                        raise ValueError("No locations found in Shopify store")
-                    
-                    # Use the first location (typically the main location)
-                    primary_location_id = locations[0]["id"]
+            session = await get_http_session()
+            
+            # First, get all locations
+            locations_url = f"{base_url}/locations.json"
+            async with session.get(locations_url, headers=headers) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    raise HTTPException(
+                        status_code=response.status,
+                        detail=f"Shopify Locations API error: {error_text}"
+                    )
                 
-                # Get all products with their variants
-                products_url = f"{base_url}/products.json?limit=250"
-                page_info = None
-                total_products_processed = 0
+                locations_data = await _read_json(response)
+                locations = locations_data.get("locations", [])
                 
-                while True:
-                    url = products_url
-                    if page_info:
-                        url = f"{base_url}/products.json?limit=250&page_info={page_info}"
-                    
-                    logger.info(f"Fetching products from: {url}")
-                    
-                    async with session.get(url, headers=headers) as response:
-                        if response.status != 200:
-                            error_text = await response.text()
-                            raise HTTPException(
-                                status_code=response.status,
-                                detail=f"Shopify Products API error: {error_text}"
-                            )
-                        
-                        products_data = await response.json()
-                        products = products_data.get("products", [])
+                if not locations:
+                    raise ValueError("No locations found in Shopify store")
+                
+                # Use the first location (typically the main location)
+                primary_location_id = locations[0]["id"]
+                # variant.inventory_quantity is summed across locations, so it only
+                # equals the primary location's stock when there is a single location
+                single_location = len(locations) == 1
+            
+            # Get all products with their variants. Pages are fetched by a background
+            # producer so the next page is already in flight while the current one is
+            # being written; at most two pages are buffered.
+            products_url = f"{base_url}/products.json?limit=250"
+            total_products_processed = 0
+            page_queue: asyncio.Queue = asyncio.Queue(maxsize=2)
+            
+            async def fetch_product_pages():
+                page_info = None
+                try:
+                    while True:
+                        url = products_url
+                        if page_info:
+                            url = f"{base_url}/products.json?limit=250&page_info={page_info}"
                         
-                        logger.info(f"Processing {len(products)} products from this page")
-                        total_products_processed += len(products)
+                        logger.info("Fetching products from: %s", url)
                         
-                        # Process each product and its variants
-                        for product in products:
-                            product_title = product.get("title", "")
-                            variants = product.get("variants", [])
-                            
-                            logger.debug(f"Processing product: {product_title} with {len(variants)} variants")
+                        async with session.get(url, headers=headers) as response:
+                            if response.status != 200:
+                                error_text = await response.text()
+                                raise HTTPException(
+                                    status_code=response.status,
+                                    detail=f"Shopify Products API error: {error_text}"
+                                )
                             
-                            for variant in variants:
-                                variant_id = variant.get("id")
-                                sku = variant.get("sku")
-                                
-                                if not sku:
-                                    # Skip variants without SKU
-                                    logger.info(f"Skipping variant {variant_id} of '{product_title}' - no SKU")
-                                    continue
-                                
-                                variant_title = variant.get("title", "")
-                                price = float(variant.get("price", 0))
-                                
-                                logger.debug(f"Processing variant: {variant_title} (SKU: {sku})")
-                                
-                                # Get inventory level for this variant at the primary location
-                                inventory_item_id = variant.get("inventory_item_id")
-                                if not inventory_item_id:
-                                    logger.warning(f"No inventory_item_id for variant {variant_id} (SKU: {sku})")
-                                    continue
-                                
-                                inventory_url = f"{base_url}/inventory_levels.json?inventory_item_ids={inventory_item_id}&location_ids={primary_location_id}"
-                                
-                                async with session.get(inventory_url, headers=headers) as inv_response:
-                                    if inv_response.status == 200:
-                                        inv_data = await inv_response.json()
-                                        inventory_levels = inv_data.get("inventory_levels", [])
-                                        
-                                        available_quantity = 0
-                                        if inventory_levels:
-                                            available_quantity = inventory_levels[0].get("available", 0)
-                                        
-                                        # Build product name with variant info
-                                        full_name = product_title
-                                        if variant_title and variant_title != "Default Title":
-                                            full_name = f"{product_title} - {variant_title}"
-                                        
-                                        logger.info(f"Syncing product: {sku} - {full_name} (Qty: {available_quantity})")
-                                        
-                                        # Update or create product
-                                        result = await self._update_or_create_product(
-                                            sku=sku,
-                                            name=full_name,
-                                            variant=variant_title if variant_title != "Default Title" else None,
-                                            on_hand=available_quantity,
-                                            cost=price,  # Use price as cost estimate
-                                            source="shopify",
-                                            reference_id=str(variant_id),
-                                            user_id=connector.created_by
-                                        )
-                                        
-                                        items_synced += 1
-                                        if result["created"]:
-                                            items_created += 1
-                                            logger.info(f"Created new product: {sku}")
-                                        else:
-                                            items_updated += 1
-                                            logger.info(f"Updated existing product: {sku}")
-                                            
-                                        logger.debug(f"Processed product: {sku} - {full_name}")
-                                    else:
-                                        error_text = await inv_response.text()
-                                        logger.warning(f"Failed to get inventory for variant {variant_id} (SKU: {sku}): {error_text}")
+                            # Product pages can be hundreds of KB; decode them off the event loop
+                            products_data = await asyncio.to_thread(orjson.loads, await response.read())
+                            link_header = response.headers.get("Link")
+                        
+                        await page_queue.put(products_data.get("products", []))
                         
                         # Check for pagination using Link header
-                        link_header = response.headers.get("Link")
                         page_info = None
                         
                         if link_header and "rel=\"next\"" in link_header:
                             # Extract page_info from Link header
-                            # Format: <https://shop.myshopify.com/admin/api/2025-01/products.json?limit=250&page_info=xyz>; rel="next"
-                            import re
-                            next_match = re.search(r'<[^>]*[?&]page_info=([^&>]+)[^>]*>;\s*rel="next"', link_header)
+                            next_match = _SHOPIFY_NEXT_PAGE_RE.search(link_header)
                             if next_match:
                                 page_info = next_match.group(1)
-                                logger.info(f"Found next page with page_info: {page_info}")
+                                logger.info("Found next page with page_info: %s", page_info)
                             else:
                                 logger.info("No valid page_info found in Link header, ending pagination")
                                 break
                         else:
                             logger.info("No next page found, ending pagination")
                             break
-                
-                logger.info(f"Shopify sync completed. Total products processed: {total_products_processed}, Items synced: {items_synced}")
+                except Exception as e:
+                    # Hand fetch errors to the consumer so they surface from the sync
+                    await page_queue.put(e)
+                    return
+                await page_queue.put(None)
+            
+            producer = asyncio.create_task(fetch_product_pages())
+            try:
+                while True:
+                    products = await page_queue.get()
+                    if products is None:
+                        break
+                    if isinstance(products, Exception):
+                        raise products
+                    
+                    logger.info("Processing %d products from this page", len(products))
+                    total_products_processed += len(products)
+                    
+                    # Fetch stock for every variant on the page that needs the inventory API
+                    inventory_item_ids = [
+                        variant["inventory_item_id"]
+                        for product in products
+                        for variant in product.get("variants", [])
+                        if variant.get("sku") and variant.get("inventory_item_id")
+                        and (variant.get("inventory_quantity") is None or not single_location)
+                    ]
+                    inventory_levels = await self._fetch_shopify_inventory_levels(
+                        session, base_url, headers, inventory_item_ids, primary_location_id
+                    )
+                    
+                    # Process each product and its variants
+                    log_debug = logger.isEnabledFor(logging.DEBUG)
+                    page_items = []
+                    for product in products:
+                        product_title = product.get("title", "")
+                        variants = product.get("variants", [])
+                        
+                        if log_debug:
+                            logger.debug("Processing product: %s with %d variants", product_title, len(variants))
+                        
+                        for variant in variants:
+                            variant_id = variant.get("id")
+                            sku = variant.get("sku")
+                            
+                            if not sku:
+                                # Skip variants without SKU
+                                if log_debug:
+                                    logger.debug("Skipping variant %s of '%s' - no SKU", variant_id, product_title)
+                                continue
+                            
+                            variant_title = variant.get("title", "")
+                            price = float(variant.get("price", 0))
+                            
+                            # Get inventory level for this variant at the primary location
+                            available_quantity = variant.get("inventory_quantity")
+                            if available_quantity is None or not single_location:
+                                inventory_item_id = variant.get("inventory_item_id")
+                                if not inventory_item_id:
+                                    logger.warning("No inventory_item_id for variant %s (SKU: %s)", variant_id, sku)
+                                    continue
+                                if inventory_item_id not in inventory_levels:
+                                    logger.warning("Failed to get inventory for variant %s (SKU: %s)", variant_id, sku)
+                                    continue
+                                available_quantity = inventory_levels[inventory_item_id]
+                            
+                            # Build product name with variant info
+                            full_name = product_title
+                            if variant_title and variant_title != "Default Title":
+                                full_name = f"{product_title} - {variant_title}"
+                            
+                            if log_debug:
+                                logger.debug("Syncing product: %s - %s (Qty: %s)", sku, full_name, available_quantity)
+                            
+                            page_items.append({
+                                "sku": sku,
+                                "name": full_name,
+                                "variant": variant_title if variant_title != "Default Title" else None,
+                                "on_hand": available_quantity,
+                                "cost": price,  # Use price as cost estimate
+                                "reference_id": str(variant_id)
+                            })
+                    
+                    # Update or create the whole page's products in one batch
+                    results = await asyncio.to_thread(
+                        self._bulk_upsert_products,
+                        page_items,
+                        user_id=connector.created_by,
+                        source="shopify",
+                        commit=False
+                    )
+                    items_synced += len(results)
+                    for result in results:
+                        if result["created"]:
+                            items_created += 1
+                        elif result["updated"]:
+                            items_updated += 1
+                        else:
+                            items_unchanged += 1
+            finally:
+                producer.cancel()
+            
+            logger.info(
+                "Shopify sync completed. Total products processed: %d, Items synced: %d",
+                total_products_processed, items_synced
+            )
             
             # Update connector last sync time
-            connector.last_sync = datetime.utcnow()
+            connector.last_sync = datetime.now(timezone.utc)
             connector.status = "ACTIVE"
-            self.db.add(connector)
             self.db.commit()
             
         except Exception as e:
             logger.error(f"Shopify sync error: {str(e)}")
             errors.append(str(e))
+            # Discard the uncommitted batch before recording the failure
+            self.db.rollback()
             connector.status = "ERROR"
-            self.db.add(connector)
             self.db.commit()
         
         return ConnectorSync(
@@ -218,11 +597,53 @@ class ConnectorService:
             items_synced=items_synced,
             items_updated=items_updated,
             items_created=items_created,
+            items_unchanged=items_unchanged,
             sync_started_at=sync_started_at,
-            sync_completed_at=datetime.utcnow(),
+            sync_completed_at=datetime.now(timezone.utc),
             errors=errors
         )
     
+    async def _fetch_shopify_inventory_levels(
+        self,
+        session: aiohttp.ClientSession,
+        base_url: str,
+        headers: Dict[str, str],
+        inventory_item_ids: List[int],
+        location_id: int
+    ) -> Dict[int, int]:
+        """
+        Fetch available quantities at a location for many inventory items, batching ids
+        per request and running up to SHOPIFY_MAX_CONNECTIONS batches concurrently.
+        Items from failed batches are left out of the result.
+        """
+        batches = [
+            inventory_item_ids[i:i + SHOPIFY_INVENTORY_BATCH_SIZE]
+            for i in range(0, len(inventory_item_ids), SHOPIFY_INVENTORY_BATCH_SIZE)
+        ]
+        
+        limiter = asyncio.Semaphore(SHOPIFY_MAX_CONNECTIONS)
+        
+        async def fetch_batch(batch: List[int]) -> Dict[int, int]:
+            ids = ",".join(str(item_id) for item_id in batch)
+            url = f"{base_url}/inventory_levels.json?inventory_item_ids={ids}&location_ids={location_id}"
+            async with limiter, session.get(url, headers=headers) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    logger.warning("Failed to get inventory levels for %d items: %s", len(batch), error_text)
+                    return {}
+                data = await _read_json(response)
+            
+            # Items without a level at this location have no stock there
+            available = dict.fromkeys(batch, 0)
+            for level in data.get("inventory_levels", []):
+                available[level.get("inventory_item_id")] = level.get("available") or 0
+            return available
+        
+        levels: Dict[int, int] = {}
+        for batch_levels in await asyncio.gather(*(fetch_batch(batch) for batch in batches)):
+            levels.update(batch_levels)
+        return levels
+    
     async def sync_square(self, connector_id: UUID) -> ConnectorSync:
         """Sync inventory from Square Inventory API"""
         connector = self.db.exec(select(Connector).where(Connector.id == connector_id)).first()
@@ -232,10 +653,11 @@ class ConnectorService:
         if connector.provider != ConnectorProvider.SQUARE:
             raise HTTPException(status_code=400, detail="Invalid provider for Square sync")
         
-        sync_started_at = datetime.utcnow()
+        sync_started_at = datetime.now(timezone.utc)
         items_synced = 0
         items_updated = 0
         items_created = 0
+        items_unchanged = 0
         errors = []
         
         try:
@@ -248,73 +670,84 @@ class ConnectorService:
             # Get inventory changes
             url = "https://connect.squareup.com/v2/inventory/changes/batch-retrieve"
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, headers=headers, json={}) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        raise HTTPException(
-                            status_code=response.status,
-                            detail=f"Square API error: {error_text}"
-                        )
+            session = await get_http_session()
+            
+            async with session.post(url, headers=headers, json={}) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    raise HTTPException(
+                        status_code=response.status,
+                        detail=f"Square API error: {error_text}"
+                    )
+                
+                data = await asyncio.to_thread(orjson.loads, await response.read())
+                changes = data.get("changes", [])
+                
+                sync_items = []
+                for change in changes:
+                    if change.get("type") != "PHYSICAL_COUNT":
+                        continue
                     
-                    data = await response.json()
-                    changes = data.get("changes", [])
+                    physical_count = change.get("physical_count", {})
+                    catalog_object_id = physical_count.get("catalog_object_id")
+                    quantity = int(physical_count.get("quantity", 0))
                     
-                    for change in changes:
-                        if change.get("type") != "PHYSICAL_COUNT":
-                            continue
-                        
-                        physical_count = change.get("physical_count", {})
-                        catalog_object_id = physical_count.get("catalog_object_id")
-                        quantity = int(physical_count.get("quantity", 0))
-                        
-                        if not catalog_object_id:
-                            continue
-                        
-                        # Get catalog item details
-                        catalog_url = f"https://connect.squareup.com/v2/catalog/object/{catalog_object_id}"
-                        async with session.get(catalog_url, headers=headers) as catalog_response:
-                            if catalog_response.status == 200:
-                                catalog_data = await catalog_response.json()
-                                catalog_object = catalog_data.get("object", {})
-                                item_variation_data = catalog_object.get("item_variation_data", {})
-                                
-                                sku = item_variation_data.get("sku", catalog_object_id)
-                                name = item_variation_data.get("name", "Unknown Product")
-                                
-                                # Get price if available
-                                cost = 0.0
-                                price_money = item_variation_data.get("price_money")
-                                if price_money:
-                                    cost = float(price_money.get("amount", 0)) / 100  # Square uses cents
-                                
-                                result = await self._update_or_create_product(
-                                    sku=sku,
-                                    name=name,
-                                    on_hand=quantity,
-                                    cost=cost,
-                                    source="square",
-                                    reference_id=catalog_object_id,
-                                    user_id=connector.created_by
-                                )
-                                
-                                items_synced += 1
-                                if result["created"]:
-                                    items_created += 1
-                                else:
-                                    items_updated += 1
+                    if not catalog_object_id:
+                        continue
+                    
+                    # Get catalog item details
+                    catalog_url = f"https://connect.squareup.com/v2/catalog/object/{catalog_object_id}"
+                    async with session.get(catalog_url, headers=headers) as catalog_response:
+                        if catalog_response.status == 200:
+                            catalog_data = await _read_json(catalog_response)
+                            catalog_object = catalog_data.get("object", {})
+                            item_variation_data = catalog_object.get("item_variation_data", {})
+                            
+                            sku = item_variation_data.get("sku", catalog_object_id)
+                            name = item_variation_data.get("name", "Unknown Product")
+                            
+                            # Get price if available
+                            cost = 0.0
+                            price_money = item_variation_data.get("price_money")
+                            if price_money:
+                                cost = float(price_money.get("amount", 0)) / 100  # Square uses cents
+                            
+                            sync_items.append({
+                                "sku": sku,
+                                "name": name,
+                                "on_hand": quantity,
+                                "cost": cost,
+                                "reference_id": catalog_object_id
+                            })
+            
+            # Update or create all synced products in one batch
+            results = await asyncio.to_thread(
+                self._bulk_upsert_products,
+                sync_items,
+                user_id=connector.created_by,
+                source="square",
+                commit=False
+            )
+            items_synced = len(results)
+            for result in results:
+                if result["created"]:
+                    items_created += 1
+                elif result["updated"]:
+                    items_updated += 1
+                else:
+                    items_unchanged += 1
             
             # Update connector
-            connector.last_sync = datetime.utcnow()
+            connector.last_sync = datetime.now(timezone.utc)
             connector.status = "ACTIVE"
-            self.db.add(connector)
             self.db.commit()
             
         except Exception as e:
             logger.error(f"Square sync error: {str(e)}")
             errors.append(str(e))
+            # Discard the uncommitted batch before recording the failure
+            self.db.rollback()
             connector.status = "ERROR"
-            self.db.add(connector)
             self.db.commit()
         
         return ConnectorSync(
@@ -324,8 +757,9 @@ class ConnectorService:
             items_synced=items_synced,
             items_updated=items_updated,
             items_created=items_created,
+            items_unchanged=items_unchanged,
             sync_started_at=sync_started_at,
-            sync_completed_at=datetime.utcnow(),
+            sync_completed_at=datetime.now(timezone.utc),
             errors=errors
         )
     
@@ -338,10 +772,11 @@ class ConnectorService:
         if connector.provider != ConnectorProvider.LIGHTSPEED:
             raise HTTPException(status_code=400, detail="Invalid provider for Lightspeed sync")
         
-        sync_started_at = datetime.utcnow()
+        sync_started_at = datetime.now(timezone.utc)
         items_synced = 0
         items_updated = 0
         items_created = 0
+        items_unchanged = 0
         errors = []
         
         try:
@@ -357,58 +792,69 @@ class ConnectorService:
             # Get items from Lightspeed
             url = f"https://api.lightspeedapp.com/API/Account/{account_id}/Item.json"
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        raise HTTPException(
-                            status_code=response.status,
-                            detail=f"Lightspeed API error: {error_text}"
-                        )
-                    
-                    data = await response.json()
-                    items = data.get("Item", [])
+            session = await get_http_session()
+            
+            async with session.get(url, headers=headers) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    raise HTTPException(
+                        status_code=response.status,
+                        detail=f"Lightspeed API error: {error_text}"
+                    )
+                
+                data = await asyncio.to_thread(orjson.loads, await response.read())
+                items = data.get("Item", [])
+                
+                # Ensure items is a list
+                if not isinstance(items, list):
+                    items = [items] if items else []
+                
+                sync_items = []
+                for item in items:
+                    sku = item.get("customSku") or item.get("systemSku", "")
+                    if not sku:
+                        continue
                     
-                    # Ensure items is a list
-                    if not isinstance(items, list):
-                        items = [items] if items else []
+                    name = item.get("description", "Unknown Product")
+                    quantity = int(item.get("qtyOnHand", 0))
+                    cost = float(item.get("defaultCost", 0))
                     
-                    for item in items:
-                        sku = item.get("customSku") or item.get("systemSku", "")
-                        if not sku:
-                            continue
-                        
-                        name = item.get("description", "Unknown Product")
-                        quantity = int(item.get("qtyOnHand", 0))
-                        cost = float(item.get("defaultCost", 0))
-                        
-                        result = await self._update_or_create_product(
-                            sku=sku,
-                            name=name,
-                            on_hand=quantity,
-                            cost=cost,
-                            source="lightspeed",
-                            reference_id=str(item.get("itemID", "")),
-                            user_id=connector.created_by
-                        )
-                        
-                        items_synced += 1
-                        if result["created"]:
-                            items_created += 1
-                        else:
-                            items_updated += 1
+                    sync_items.append({
+                        "sku": sku,
+                        "name": name,
+                        "on_hand": quantity,
+                        "cost": cost,
+                        "reference_id": str(item.get("itemID", ""))
+                    })
+            
+            # Update or create all synced products in one batch
+            results = await asyncio.to_thread(
+                self._bulk_upsert_products,
+                sync_items,
+                user_id=connector.created_by,
+                source="lightspeed",
+                commit=False
+            )
+            items_synced = len(results)
+            for result in results:
+                if result["created"]:
+                    items_created += 1
+                elif result["updated"]:
+                    items_updated += 1
+                else:
+                    items_unchanged += 1
             
             # Update connector
-            connector.last_sync = datetime.utcnow()
+            connector.last_sync = datetime.now(timezone.utc)
             connector.status = "ACTIVE"
-            self.db.add(connector)
             self.db.commit()
             
         except Exception as e:
             logger.error(f"Lightspeed sync error: {str(e)}")
             errors.append(str(e))
+            # Discard the uncommitted batch before recording the failure
+            self.db.rollback()
             connector.status = "ERROR"
-            self.db.add(connector)
             self.db.commit()
         
         return ConnectorSync(
@@ -418,8 +864,9 @@ class ConnectorService:
             items_synced=items_synced,
             items_updated=items_updated,
             items_created=items_created,
+            items_unchanged=items_unchanged,
             sync_started_at=sync_started_at,
-            sync_completed_at=datetime.utcnow(),
+            sync_completed_at=datetime.now(timezone.utc),
             errors=errors
         )
     
@@ -435,6 +882,36 @@ class ConnectorService:
         user_id: Optional[UUID] = None
     ) -> CSVUploadResponse:
         """Enhanced CSV import with comprehensive workflow"""
+        result = None
+        async for event in self.import_csv_stream(
+            file=file,
+            sku_column=sku_column,
+            name_column=name_column,
+            on_hand_column=on_hand_column,
+            cost_column=cost_column,
+            supplier_name_column=supplier_name_column,
+            variant_column=variant_column,
+            user_id=user_id
+        ):
+            if event["event"] == "complete":
+                result = event["result"]
+        return result
+    
+    async def import_csv_stream(
+        self, 
+        file: UploadFile, 
+        sku_column: str,
+        name_column: str,
+        on_hand_column: str,
+        cost_column: Optional[str] = None,
+        supplier_name_column: Optional[str] = None,
+        variant_column: Optional[str] = None,
+        user_id: Optional[UUID] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        CSV import as a stream of events: "started" once the file is validated, "progress"
+        every CSV_PROGRESS_INTERVAL rows and "complete" carrying the CSVUploadResponse
+        """
         
         if not file.filename.endswith('.csv'):
             raise HTTPException(status_code=400, detail="File must be a CSV")
@@ -443,93 +920,42 @@ class ConnectorService:
         imported_items = 0
         updated_items = 0
         created_items = 0
+        unchanged_items = 0
         errors = []
         warnings = []
-        duplicate_skus = set()
-        processed_skus = set()
         validation_errors = []
         threshold_updates = []
         
         try:
-            # Step 1: Read and parse CSV content
+            # Step 1: Read the CSV and validate the header
             content = await file.read()
-            csv_content = content.decode('utf-8')
-            csv_reader = csv.DictReader(io.StringIO(csv_content))
+            fieldnames = _read_csv_header(content)
             
             # Validate required columns
-            if sku_column not in csv_reader.fieldnames:
+            if sku_column not in fieldnames:
                 raise HTTPException(status_code=400, detail=f"SKU column '{sku_column}' not found")
-            if name_column not in csv_reader.fieldnames:
+            if name_column not in fieldnames:
                 raise HTTPException(status_code=400, detail=f"Name column '{name_column}' not found")
-            if on_hand_column not in csv_reader.fieldnames:
+            if on_hand_column not in fieldnames:
                 raise HTTPException(status_code=400, detail=f"Quantity column '{on_hand_column}' not found")
             
-            # Step 2: First pass - validate structure and collect data
-            rows_data = []
-            row_count = 0
+            # Step 2: First pass - validate structure and collect data (no DB access).
+            # Large files are parsed in a worker process so the event loop stays responsive.
+            parse_args = (
+                content, fieldnames, sku_column, name_column, on_hand_column,
+                cost_column, supplier_name_column, variant_column
+            )
+            if len(content) >= CSV_PARSE_OFFLOAD_BYTES:
+                loop = asyncio.get_running_loop()
+                parsed = await loop.run_in_executor(_get_csv_parse_pool(), _parse_csv_rows, *parse_args)
+            else:
+                parsed = _parse_csv_rows(*parse_args)
+            del content
             
-            for row_num, row in enumerate(csv_reader, start=2):  # Start at 2 for header
-                row_count += 1
-                
-                # Normalize and validate SKU
-                sku = self._normalize_string(row.get(sku_column, "").strip())
-                name = self._normalize_string(row.get(name_column, "").strip())
-                
-                if not sku or not name:
-                    validation_errors.append(f"Row {row_num}: Missing SKU or name")
-                    continue
-                
-                # Check for duplicate SKUs within the file
-                if sku in processed_skus:
-                    duplicate_skus.add(sku)
-                    validation_errors.append(f"Row {row_num}: Duplicate SKU '{sku}' found in CSV")
-                    continue
-                
-                processed_skus.add(sku)
-                
-                # Validate and parse quantity
-                try:
-                    on_hand_str = row.get(on_hand_column, "0").strip()
-                    on_hand = int(float(on_hand_str)) if on_hand_str else 0
-                    if on_hand < 0:
-                        validation_errors.append(f"Row {row_num}: Quantity cannot be negative")
-                        continue
-                except (ValueError, TypeError):
-                    validation_errors.append(f"Row {row_num}: Invalid quantity value '{row.get(on_hand_column, '')}'")
-                    continue
-                
-                # Validate and parse cost
-                cost = 0.0
-                if cost_column and cost_column in row and row.get(cost_column, "").strip():
-                    try:
-                        cost_str = row.get(cost_column, "0").strip()
-                        cost = float(cost_str) if cost_str else 0.0
-                        if cost < 0:
-                            warnings.append(f"Row {row_num}: Negative cost for SKU '{sku}', using 0")
-                            cost = 0.0
-                    except (ValueError, TypeError):
-                        warnings.append(f"Row {row_num}: Invalid cost value for SKU '{sku}', using 0")
-                        cost = 0.0
-                
-                # Get variant if provided
-                variant = None
-                if variant_column and variant_column in row:
-                    variant = self._normalize_string(row.get(variant_column, "").strip()) or None
-                
-                # Get supplier name
-                supplier_name = None
-                if supplier_name_column and supplier_name_column in row:
-                    supplier_name = self._normalize_string(row.get(supplier_name_column, "").strip()) or None
-                
-                rows_data.append({
-                    'row_num': row_num,
-                    'sku': sku,
-                    'name': name,
-                    'variant': variant,
-                    'on_hand': on_hand,
-                    'cost': cost,
-                    'supplier_name': supplier_name
-                })
+            rows_data = parsed["rows_data"]
+            row_count = parsed["row_count"]
+            validation_errors = parsed["validation_errors"]
+            warnings = parsed["warnings"]
             
             # Check if we have too many validation errors
             if len(validation_errors) > 50:
@@ -538,40 +964,33 @@ class ConnectorService:
                     detail=f"Too many validation errors ({len(validation_errors)}). Please fix your CSV and try again."
                 )
             
-            # Step 3: Process valid rows
-            for row_data in rows_data:
-                try:
-                    # Handle supplier
-                    supplier_id = None
-                    if row_data['supplier_name']:
-                        supplier = self._get_or_create_supplier(row_data['supplier_name'], user_id)
-                        supplier_id = supplier.id
-                    
-                    # Update or create product
-                    result = await self._update_or_create_product(
-                        sku=row_data['sku'],
-                        name=row_data['name'],
-                        variant=row_data['variant'],
-                        on_hand=row_data['on_hand'],
-                        cost=row_data['cost'],
-                        supplier_id=supplier_id,
-                        user_id=user_id,
-                        source="csv",
-                        reference_id=f"csv_import_{datetime.utcnow().isoformat()}"
-                    )
-                    
-                    imported_items += 1
-                    if result["created"]:
-                        created_items += 1
-                    else:
-                        updated_items += 1
-                    
-                    # Track products that need threshold evaluation
-                    threshold_updates.append(result["product"])
-                        
-                except Exception as e:
-                    errors.append(f"Row {row_data['row_num']}: {str(e)}")
-                    continue
+            total_rows = len(rows_data)
+            yield {"event": "started", "total": total_rows}
+            
+            # Step 3: Process valid rows in chunks (blocking DB work runs in a worker thread)
+            import_ref = f"csv_import_{datetime.now(timezone.utc).isoformat()}"
+            for start in range(0, total_rows, CSV_PROGRESS_INTERVAL):
+                results = await asyncio.to_thread(
+                    self._import_csv_rows,
+                    rows_data[start:start + CSV_PROGRESS_INTERVAL],
+                    user_id,
+                    import_ref
+                )
+                imported_items += results["imported_items"]
+                created_items += results["created_items"]
+                updated_items += results["updated_items"]
+                unchanged_items += results["unchanged_items"]
+                errors.extend(results["errors"])
+                threshold_updates.extend(results["threshold_updates"])
+                
+                yield {
+                    "event": "progress",
+                    "processed": min(start + CSV_PROGRESS_INTERVAL, total_rows),
+                    "total": total_rows,
+                    "created": created_items,
+                    "updated": updated_items,
+                    "unchanged": unchanged_items
+                }
             
             # Step 4: Run threshold engine for updated products
             await self._run_threshold_engine(threshold_updates)
@@ -589,10 +1008,12 @@ class ConnectorService:
                     "items_imported": imported_items,
                     "items_created": created_items,
                     "items_updated": updated_items,
+                    "items_unchanged": unchanged_items,
                     "errors_count": len(errors),
                     "warnings_count": len(warnings)
                 }
             )
+            await self._flush_audits()
             
             # Combine validation errors with processing errors
             all_errors = validation_errors + errors
@@ -610,131 +1031,247 @@ class ConnectorService:
                         "error": str(e)
                     }
                 )
+                await self._flush_audits()
             raise HTTPException(status_code=400, detail=f"CSV processing error: {str(e)}")
         
-        return CSVUploadResponse(
-            imported_items=imported_items,
-            updated_items=updated_items,
-            created_items=created_items,
-            errors=all_errors,
-            warnings=warnings
+        yield {
+            "event": "complete",
+            "result": CSVUploadResponse(
+                imported_items=imported_items,
+                updated_items=updated_items,
+                created_items=created_items,
+                unchanged_items=unchanged_items,
+                errors=all_errors,
+                warnings=warnings
+            )
+        }
+    
+    def _import_csv_rows(
+        self,
+        rows_data: List[Dict[str, Any]],
+        user_id: Optional[UUID],
+        reference_id: str
+    ) -> Dict[str, Any]:
+        """Upsert validated CSV rows; synchronous so the whole batch can run off the event loop"""
+        results = {
+            "imported_items": 0,
+            "created_items": 0,
+            "updated_items": 0,
+            "unchanged_items": 0,
+            "errors": [],
+            "threshold_updates": []
+        }
+        organization_id = self._get_organization_id(user_id)
+        
+        # Resolve every supplier named in the batch up front
+        suppliers = self._resolve_suppliers_bulk(
+            (row_data['supplier_name'] for row_data in rows_data if row_data['supplier_name']),
+            user_id,
+            organization_id
         )
+        
+        items = [
+            {
+                "sku": row_data['sku'],
+                "name": row_data['name'],
+                "variant": row_data['variant'],
+                "on_hand": row_data['on_hand'],
+                "cost": row_data['cost'],
+                "supplier_id": suppliers[row_data['supplier_name']].id if row_data['supplier_name'] else None,
+                "reference_id": reference_id
+            }
+            for row_data in rows_data
+        ]
+        
+        # Upsert the whole batch in one transaction; if that fails, retry row by row
+        # so a single bad row is reported instead of failing the batch
+        try:
+            upserted = self._bulk_upsert_products(
+                items, user_id=user_id, source="csv", organization_id=organization_id
+            )
+        except Exception:
+            self.db.rollback()
+            upserted = []
+            for row_data, item in zip(rows_data, items):
+                try:
+                    upserted.append(self._bulk_upsert_products(
+                        [item], user_id=user_id, source="csv", organization_id=organization_id
+                    )[0])
+                except Exception as e:
+                    self.db.rollback()
+                    results["errors"].append(f"Row {row_data['row_num']}: {str(e)}")
+        
+        for result in upserted:
+            results["imported_items"] += 1
+            if result["created"]:
+                results["created_items"] += 1
+            elif result["updated"]:
+                results["updated_items"] += 1
+            else:
+                results["unchanged_items"] += 1
+            
+            # Track products that need threshold evaluation
+            results["threshold_updates"].append(result["product"])
+        
+        return results
     
-    def _normalize_string(self, value: str) -> str:
-        """Normalize string values (trim, case, etc.)"""
-        if not value:
-            return ""
-        # Trim whitespace and normalize case for names/suppliers
-        return value.strip()
+    def _get_organization_id(self, user_id: Optional[UUID], required: bool = False) -> Optional[int]:
+        """
+        Resolve (and cache) the organization_id for a user.
+        With required=True a missing user raises a 404 instead of returning None.
+        """
+        if not user_id:
+            return None
+        if user_id not in self._user_org_cache:
+            row = self.db.exec(
+                select(User.id, User.organization_id).where(User.id == user_id)
+            ).first()
+            if row is None:
+                if required:
+                    raise HTTPException(status_code=404, detail="User not found")
+                return None
+            self._user_org_cache[user_id] = row.organization_id
+        return self._user_org_cache[user_id]
     
-    def _get_or_create_supplier(self, supplier_name: str, user_id: Optional[UUID] = None) -> Supplier:
-        """Get existing supplier or create new one with user_id and organization_id"""
+    def _resolve_suppliers_bulk(
+        self,
+        names: Iterable[str],
+        user_id: Optional[UUID] = None,
+        organization_id: Optional[int] = None
+    ) -> Dict[str, Supplier]:
+        """
+        Map each supplier name to an existing or newly created supplier using one IN query
+        and a single commit for every supplier that has to be created
+        """
+        names = set(names)
+        if not names:
+            return {}
         
-        # Get user's organization_id
-        organization_id = None
-        if user_id:
-            from app.models.data_models.User import User
-            user = self.db.exec(select(User).where(User.id == user_id)).first()
-            if user:
-                organization_id = user.organization_id
+        # Get user's organization_id unless the caller already resolved it
+        if organization_id is None:
+            organization_id = self._get_organization_id(user_id)
         
-        # First check if supplier exists within the organization
-        supplier = None
-        if organization_id:
-            supplier = self.db.exec(
-                select(Supplier).where(
-                    (Supplier.name == supplier_name) & 
-                    (Supplier.organization_id == organization_id)
-                )
-            ).first()
-        elif user_id:
-            # Fallback to user_id if no organization_id
-            supplier = self.db.exec(
-                select(Supplier).where(
-                    (Supplier.name == supplier_name) & 
-                    (Supplier.user_id == user_id)
-                )
-            ).first()
+        # First look suppliers up within the organization, falling back to the user
+        suppliers: Dict[str, Supplier] = {}
+        params = {"names": list(names), "organization_id": organization_id or None, "user_id": user_id}
+        for supplier in self.db.exec(_SUPPLIER_LOOKUP_STMT, params=params):
+            suppliers.setdefault(supplier.name, supplier)
         
         # If not found and no user_id, check globally (for backward compatibility)
-        if not supplier and not user_id:
-            supplier = self.db.exec(
-                select(Supplier).where(Supplier.name == supplier_name)
-            ).first()
+        if not user_id and organization_id and len(suppliers) < len(names):
+            params = {"names": list(names - suppliers.keys()), "organization_id": None, "user_id": None}
+            for supplier in self.db.exec(_SUPPLIER_LOOKUP_STMT, params=params):
+                suppliers.setdefault(supplier.name, supplier)
         
-        if not supplier:
-            # Create new supplier with basic info
-            supplier_data = {
-                "name": supplier_name,
-                "contact_email": f"{supplier_name.lower().replace(' ', '').replace('.', '')}@example.com"
-            }
-            
-            # Set user_id and organization_id if provided
-            if user_id:
-                supplier_data["user_id"] = user_id
-            if organization_id:
-                supplier_data["organization_id"] = organization_id
+        missing = names - suppliers.keys()
+        if missing:
+            # Create new suppliers with basic info
+            new_suppliers = []
+            for supplier_name in missing:
+                supplier_data = {
+                    "name": supplier_name,
+                    "contact_email": f"{supplier_name.lower().translate(_SUPPLIER_SLUG_TABLE)}@example.com"
+                }
+                
+                # Set user_id and organization_id if provided
+                if user_id:
+                    supplier_data["user_id"] = user_id
+                if organization_id:
+                    supplier_data["organization_id"] = organization_id
+                
+                supplier = Supplier(**supplier_data)
+                suppliers[supplier_name] = supplier
+                new_suppliers.append(supplier)
             
-            supplier = Supplier(**supplier_data)
-            self.db.add(supplier)
+            self.db.add_all(new_suppliers)
             self.db.commit()
-            self.db.refresh(supplier)
-            logger.info(f"Created new supplier: {supplier_name} for organization {organization_id}")
+            logger.info("Created %d new suppliers for organization %s", len(new_suppliers), organization_id)
         
-        return supplier
+        return suppliers
     
     async def _run_threshold_engine(self, products: List[Product]):
-        """Run threshold calculations for updated products"""
-        for product in products:
-            try:
-                # Simple threshold calculation (can be enhanced)
+        """Fill in missing thresholds for updated products with one vectorized pass and bulk UPDATE"""
+        pending = [
+            product for product in products
+            if product.reorder_point is None or product.safety_stock is None
+        ]
+        if pending:
+            on_hand = np.fromiter((product.on_hand for product in pending), dtype=np.int64, count=len(pending))
+            # Default reorder point is 20% of current stock (minimum 5),
+            # safety stock 10% of current stock (minimum 3)
+            reorder_points = np.maximum((on_hand * 0.2).astype(np.int64), 5).tolist()
+            safety_stocks = np.maximum((on_hand * 0.1).astype(np.int64), 3).tolist()
+            
+            mappings = []
+            for product, reorder_point, safety_stock in zip(pending, reorder_points, safety_stocks):
+                mapping = {"id": product.id}
                 if product.reorder_point is None:
-                    # Set default reorder point to 20% of current stock or minimum 5
-                    product.reorder_point = max(int(product.on_hand * 0.2), 5)
-                
+                    mapping["reorder_point"] = reorder_point
                 if product.safety_stock is None:
-                    # Set safety stock to 10% of current stock or minimum 3
-                    product.safety_stock = max(int(product.on_hand * 0.1), 3)
-                
-                self.db.add(product)
-                logger.info(f"Updated thresholds for product {product.sku}: reorder={product.reorder_point}, safety={product.safety_stock}")
-                
+                    mapping["safety_stock"] = safety_stock
+                mappings.append(mapping)
+            
+            try:
+                self.db.bulk_update_mappings(Product, mappings)
             except Exception as e:
-                logger.error(f"Error updating thresholds for product {product.sku}: {str(e)}")
+                logger.error("Error updating thresholds for %d products: %s", len(mappings), e)
+                self.db.rollback()
+                return
+            
+            # Mirror the written values on the loaded objects without marking them dirty
+            for product, mapping in zip(pending, mappings):
+                for key in ("reorder_point", "safety_stock"):
+                    if key in mapping:
+                        set_committed_value(product, key, mapping[key])
+            logger.debug("Updated thresholds for %d products", len(mappings))
         
         self.db.commit()
     
     async def _generate_stock_alerts(self, products: List[Product], user_id: Optional[UUID]):
         """Generate alerts for products that need reordering"""
-        for product in products:
+        low_stock = [
+            product for product in products
+            if product.reorder_point and product.on_hand <= product.reorder_point
+        ]
+        
+        # Products that already have an open low stock alert, fetched in IN (...) batches
+        alerted_ids: Set[UUID] = set()
+        product_ids = list({product.id for product in low_stock})
+        for start in range(0, len(product_ids), PRODUCT_LOOKUP_BATCH_SIZE):
+            alerted_ids.update(self.db.exec(
+                select(Alert.product_id).where(
+                    Alert.product_id.in_(product_ids[start:start + PRODUCT_LOOKUP_BATCH_SIZE]),
+                    Alert.alert_type == AlertType.LOW_STOCK,
+                    Alert.is_resolved == False
+                )
+            ))
+        
+        # Estimated days of stock for the whole batch (same formula as _calculate_days_of_stock)
+        reorder_points = np.fromiter((product.reorder_point for product in low_stock), dtype=np.float64, count=len(low_stock))
+        on_hand = np.fromiter((product.on_hand for product in low_stock), dtype=np.float64, count=len(low_stock))
+        daily_usage = np.maximum(reorder_points * 0.1, 1)
+        days_of_stock = np.maximum((on_hand / daily_usage).astype(np.int64), 0).tolist()
+        
+        log_debug = logger.isEnabledFor(logging.DEBUG)
+        new_alerts = []
+        for product, days_left in zip(low_stock, days_of_stock):
             try:
-                if product.reorder_point and product.on_hand <= product.reorder_point:
-                    # Check if alert already exists for this product
-                    existing_alert = self.db.exec(
-                        select(Alert).where(
-                            Alert.product_id == product.id,
-                            Alert.alert_type == AlertType.LOW_STOCK,
-                            Alert.is_resolved == False
-                        )
-                    ).first()
+                if product.id not in alerted_ids:
+                    alerted_ids.add(product.id)
+                    new_alerts.append(Alert(
+                        alert_type=AlertType.LOW_STOCK,
+                        product_id=product.id,
+                        message=f"Reorder {product.reorder_point - product.on_hand + product.safety_stock} units of '{product.name}' (SKU: {product.sku}) – only {days_left} days of stock left",
+                        severity="high" if product.on_hand <= (product.safety_stock or 0) else "medium",
+                        created_by=user_id
+                    ))
+                    if log_debug:
+                        logger.debug("Created low stock alert for product %s", product.sku)
                     
-                    if not existing_alert:
-                        # Calculate estimated days of stock
-                        days_left = self._calculate_days_of_stock(product)
-                        
-                        alert = Alert(
-                            alert_type=AlertType.LOW_STOCK,
-                            product_id=product.id,
-                            message=f"Reorder {product.reorder_point - product.on_hand + product.safety_stock} units of '{product.name}' (SKU: {product.sku}) – only {days_left} days of stock left",
-                            severity="high" if product.on_hand <= (product.safety_stock or 0) else "medium",
-                            created_by=user_id
-                        )
-                        self.db.add(alert)
-                        logger.info(f"Created low stock alert for product {product.sku}")
-                        
             except Exception as e:
                 logger.error(f"Error generating alert for product {product.sku}: {str(e)}")
         
+        self.db.add_all(new_alerts)
         self.db.commit()
     
     def _calculate_days_of_stock(self, product: Product) -> int:
@@ -747,20 +1284,28 @@ class ConnectorService:
         return 0
     
     async def _create_audit_log(self, user_id: Optional[UUID], action: AuditAction, details: Dict[str, Any]):
-        """Create audit log entry for SOC-2 compliance"""
+        """Queue an audit log entry for SOC-2 compliance; written by _flush_audits"""
         if user_id:
-            try:
-                audit_entry = AuditLog(
-                    user_id=user_id,
-                    action=action,
-                    details=details,
-                    timestamp=datetime.utcnow()
-                )
-                self.db.add(audit_entry)
-                self.db.commit()
-                logger.info(f"Created audit log entry for user {user_id}: {action}")
-            except Exception as e:
-                logger.error(f"Error creating audit log: {str(e)}")
+            self._pending_audits.append(AuditLog(
+                user_id=user_id,
+                action=action,
+                details=details,
+                timestamp=datetime.now(timezone.utc)
+            ))
+    
+    async def _flush_audits(self):
+        """Write all queued audit log entries in one commit"""
+        if not self._pending_audits:
+            return
+        try:
+            self.db.add_all(self._pending_audits)
+            self.db.commit()
+            logger.info("Created %d audit log entries", len(self._pending_audits))
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Error creating audit log: {str(e)}")
+        finally:
+            self._pending_audits.clear()
     
     async def test_connection(self, connector_id: UUID) -> ConnectorTestResponse:
         """Test connector connection"""
@@ -769,19 +1314,15 @@ class ConnectorService:
             raise HTTPException(status_code=404, detail="Connector not found")
         
         try:
-            if connector.provider == ConnectorProvider.SHOPIFY:
-                return await self._test_shopify_connection(connector)
-            elif connector.provider == ConnectorProvider.SQUARE:
-                return await self._test_square_connection(connector)
-            elif connector.provider == ConnectorProvider.LIGHTSPEED:
-                return await self._test_lightspeed_connection(connector)
-            else:
+            handler = self._test_handlers.get(connector.provider)
+            if not handler:
                 return ConnectorTestResponse(
                     provider=connector.provider,
                     status="ERROR",
                     connection_valid=False,
                     error_message="Unsupported provider"
                 )
+            return await handler(connector)
         except Exception as e:
             logger.error(f"Connection test error: {str(e)}")
             return ConnectorTestResponse(
@@ -810,30 +1351,32 @@ class ConnectorService:
         # Use the latest API version and test with shop info endpoint
         url = f"https://{shop_domain}/admin/api/2025-01/shop.json"
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    shop_info = data.get("shop", {})
-                    return ConnectorTestResponse(
-                        provider=ConnectorProvider.SHOPIFY,
-                        status="ACTIVE",
-                        connection_valid=True,
-                        test_data={
-                            "shop_name": shop_info.get("name"),
-                            "shop_domain": shop_info.get("domain"),
-                            "primary_location_id": shop_info.get("primary_location_id"),
-                            "currency": shop_info.get("currency")
-                        }
-                    )
-                else:
-                    error_text = await response.text()
-                    return ConnectorTestResponse(
-                        provider=ConnectorProvider.SHOPIFY,
-                        status="ERROR",
-                        connection_valid=False,
-                        error_message=f"API error: {error_text}"
-                    )
+        session = await get_http_session()
+        
+        async with session.get(url, headers=headers) as response:
+            if response.status == 200:
+                data = await _read_json(response)
+                shop_info = data.get("shop", {})
+                # Every field is known-good here, so skip validation
+                return ConnectorTestResponse.model_construct(
+                    provider=ConnectorProvider.SHOPIFY,
+                    status="ACTIVE",
+                    connection_valid=True,
+                    test_data={
+                        "shop_name": shop_info.get("name"),
+                        "shop_domain": shop_info.get("domain"),
+                        "primary_location_id": shop_info.get("primary_location_id"),
+                        "currency": shop_info.get("currency")
+                    }
+                )
+            else:
+                error_text = await response.text()
+                return ConnectorTestResponse(
+                    provider=ConnectorProvider.SHOPIFY,
+                    status="ERROR",
+                    connection_valid=False,
+                    error_message=f"API error: {error_text}"
+                )
     
     async def _test_square_connection(self, connector: Connector) -> ConnectorTestResponse:
         """Test Square connection"""
@@ -845,28 +1388,30 @@ class ConnectorService:
         
         url = "https://connect.squareup.com/v2/locations"
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    locations = data.get("locations", [])
-                    return ConnectorTestResponse(
-                        provider=ConnectorProvider.SQUARE,
-                        status="ACTIVE",
-                        connection_valid=True,
-                        test_data={
-                            "locations_count": len(locations),
-                            "first_location": locations[0].get("name") if locations else None
-                        }
-                    )
-                else:
-                    error_text = await response.text()
-                    return ConnectorTestResponse(
-                        provider=ConnectorProvider.SQUARE,
-                        status="ERROR",
-                        connection_valid=False,
-                        error_message=f"API error: {error_text}"
-                    )
+        session = await get_http_session()
+        
+        async with session.get(url, headers=headers) as response:
+            if response.status == 200:
+                data = await _read_json(response)
+                locations = data.get("locations", [])
+                # Every field is known-good here, so skip validation
+                return ConnectorTestResponse.model_construct(
+                    provider=ConnectorProvider.SQUARE,
+                    status="ACTIVE",
+                    connection_valid=True,
+                    test_data={
+                        "locations_count": len(locations),
+                        "first_location": locations[0].get("name") if locations else None
+                    }
+                )
+            else:
+                error_text = await response.text()
+                return ConnectorTestResponse(
+                    provider=ConnectorProvider.SQUARE,
+                    status="ERROR",
+                    connection_valid=False,
+                    error_message=f"API error: {error_text}"
+                )
     
     async def _test_lightspeed_connection(self, connector: Connector) -> ConnectorTestResponse:
         """Test Lightspeed connection"""
@@ -886,138 +1431,165 @@ class ConnectorService:
         
         url = f"https://api.lightspeedapp.com/API/Account/{account_id}.json"
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    account_info = data.get("Account", {})
-                    return ConnectorTestResponse(
-                        provider=ConnectorProvider.LIGHTSPEED,
-                        status="ACTIVE",
-                        connection_valid=True,
-                        test_data={
-                            "account_name": account_info.get("name"),
-                            "account_id": account_info.get("accountID")
-                        }
-                    )
-                else:
-                    error_text = await response.text()
-                    return ConnectorTestResponse(
-                        provider=ConnectorProvider.LIGHTSPEED,
-                        status="ERROR",
-                        connection_valid=False,
-                        error_message=f"API error: {error_text}"
-                    )
+        session = await get_http_session()
+        
+        async with session.get(url, headers=headers) as response:
+            if response.status == 200:
+                data = await _read_json(response)
+                account_info = data.get("Account", {})
+                # Every field is known-good here, so skip validation
+                return ConnectorTestResponse.model_construct(
+                    provider=ConnectorProvider.LIGHTSPEED,
+                    status="ACTIVE",
+                    connection_valid=True,
+                    test_data={
+                        "account_name": account_info.get("name"),
+                        "account_id": account_info.get("accountID")
+                    }
+                )
+            else:
+                error_text = await response.text()
+                return ConnectorTestResponse(
+                    provider=ConnectorProvider.LIGHTSPEED,
+                    status="ERROR",
+                    connection_valid=False,
+                    error_message=f"API error: {error_text}"
+                )
     
-    async def _update_or_create_product(
+    def _bulk_upsert_products(
         self,
-        sku: str,
-        name: str,
-        on_hand: int,
-        cost: float = 0.0,
-        variant: Optional[str] = None,
-        supplier_id: Optional[UUID] = None,
+        items: List[Dict[str, Any]],
         user_id: Optional[UUID] = None,
         source: str = "manual",
-        reference_id: Optional[str] = None
-    ) -> Dict[str, Any]:
-        """Update existing product or create new one with user_id and organization_id"""
+        commit: bool = True,
+        organization_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Update or create many products, looking existing ones up with one IN query per
+        PRODUCT_LOOKUP_BATCH_SIZE SKUs. Each item carries sku, name, on_hand and optionally
+        cost, variant, supplier_id and reference_id; one result per item is returned in order.
+        """
         
-        # Get user's organization_id
-        organization_id = None
-        if user_id:
-            from app.models.data_models.User import User
-            user = self.db.exec(select(User).where(User.id == user_id)).first()
-            if user:
-                organization_id = user.organization_id
+        # Get user's organization_id unless the caller already resolved it
+        if organization_id is None:
+            organization_id = self._get_organization_id(user_id)
         
-        # Check if product exists within the organization (not just by user_id)
-        if organization_id:
-            existing_product = self.db.exec(
-                select(Product).where(
-                    (Product.sku == sku) & 
-                    (Product.organization_id == organization_id)
-                )
-            ).first()
-        elif user_id:
-            # Fallback to user_id if no organization_id
-            existing_product = self.db.exec(
-                select(Product).where(
-                    (Product.sku == sku) & 
-                    (Product.user_id == user_id)
-                )
-            ).first()
-        else:
-            # For backward compatibility, check globally if no user_id
-            existing_product = self.db.exec(select(Product).where(Product.sku == sku)).first()
+        skus = list({item["sku"] for item in items})
+        existing_by_sku: Dict[str, Product] = {}
+        for start in range(0, len(skus), PRODUCT_LOOKUP_BATCH_SIZE):
+            params = {
+                "skus": skus[start:start + PRODUCT_LOOKUP_BATCH_SIZE],
+                "organization_id": organization_id or None,
+                "user_id": user_id
+            }
+            for product in self.db.exec(_PRODUCT_LOOKUP_STMT, params=params):
+                existing_by_sku[product.sku] = product
         
-        if existing_product:
-            # Update existing product
-            old_quantity = existing_product.on_hand
-            quantity_delta = on_hand - old_quantity
-            
-            existing_product.on_hand = on_hand
-            existing_product.cost = cost
-            if variant:
-                existing_product.variant = variant
-            if supplier_id:
-                existing_product.supplier_id = supplier_id
-            
-            # Ensure organization_id is set if missing
-            if organization_id and not existing_product.organization_id:
-                existing_product.organization_id = organization_id
-            
-            self.db.add(existing_product)
-            
-            # Create ledger entry for the change
-            if quantity_delta != 0:
-                ledger_entry = InventoryLedger(
-                    product_id=existing_product.id,
-                    quantity_delta=quantity_delta,
+        results = []
+        for item in items:
+            sku = item["sku"]
+            on_hand = item["on_hand"]
+            cost = item.get("cost", 0.0)
+            variant = item.get("variant")
+            supplier_id = item.get("supplier_id")
+            reference_id = item.get("reference_id")
+            existing_product = existing_by_sku.get(sku)
+            
+            if existing_product:
+                # Skip the write entirely when a re-sync brings no changes
+                if (
+                    existing_product.on_hand == on_hand
+                    and existing_product.cost == cost
+                    and (not variant or existing_product.variant == variant)
+                    and (not supplier_id or existing_product.supplier_id == supplier_id)
+                    and (not organization_id or existing_product.organization_id)
+                ):
+                    results.append({"created": False, "updated": False, "product": existing_product})
+                    continue
+                
+                # Update existing product
+                quantity_delta = on_hand - existing_product.on_hand
+                
+                existing_product.on_hand = on_hand
+                existing_product.cost = cost
+                if variant:
+                    existing_product.variant = variant
+                if supplier_id:
+                    existing_product.supplier_id = supplier_id
+                
+                # Ensure organization_id is set if missing
+                if organization_id and not existing_product.organization_id:
+                    existing_product.organization_id = organization_id
+                
+                # Create ledger entry for the change
+                if quantity_delta != 0:
+                    self.db.add(InventoryLedger(
+                        product_id=existing_product.id,
+                        quantity_delta=quantity_delta,
+                        quantity_after=on_hand,
+                        source=source,
+                        reference_id=reference_id
+                    ))
+                
+                results.append({"created": False, "updated": True, "product": existing_product})
+            
+            else:
+                # Create new product
+                product_data = {
+                    "sku": sku,
+                    "name": item["name"],
+                    "variant": variant,
+                    "on_hand": on_hand,
+                    "cost": cost,
+                    "supplier_id": supplier_id
+                }
+                
+                # Set user_id and organization_id if provided
+                if user_id:
+                    product_data["user_id"] = user_id
+                if organization_id:
+                    product_data["organization_id"] = organization_id
+                
+                new_product = Product(**product_data)
+                self.db.add(new_product)
+                existing_by_sku[sku] = new_product
+                
+                # Create initial ledger entry (the product id is generated client-side)
+                self.db.add(InventoryLedger(
+                    product_id=new_product.id,
+                    quantity_delta=on_hand,
                     quantity_after=on_hand,
                     source=source,
                     reference_id=reference_id
-                )
-                self.db.add(ledger_entry)
-            
-            self.db.commit()
-            return {"created": False, "product": existing_product}
+                ))
+                
+                results.append({"created": True, "updated": False, "product": new_product})
         
-        else:
-            # Create new product
-            product_data = {
-                "sku": sku,
-                "name": name,
-                "variant": variant,
-                "on_hand": on_hand,
-                "cost": cost,
-                "supplier_id": supplier_id
-            }
-            
-            # Set user_id and organization_id if provided
-            if user_id:
-                product_data["user_id"] = user_id
-            if organization_id:
-                product_data["organization_id"] = organization_id
-            
-            new_product = Product(**product_data)
-            
-            self.db.add(new_product)
-            self.db.commit()
-            self.db.refresh(new_product)
-            
-            # Create initial ledger entry
-            ledger_entry = InventoryLedger(
-                product_id=new_product.id,
-                quantity_delta=on_hand,
-                quantity_after=on_hand,
-                source=source,
-                reference_id=reference_id
-            )
-            self.db.add(ledger_entry)
+        # Pending rows go out as batched INSERT/UPDATE statements on flush
+        if commit:
             self.db.commit()
-            
-            return {"created": True, "product": new_product}
+        
+        return results
+    
+    def _start_initial_sync(self, connector_id: UUID, provider: ConnectorProvider):
+        """Run a connector's first sync in the background on its own database session"""
+        
+        async def run_sync():
+            with Session(engine) as db:
+                service = ConnectorService(db)
+                sync = {
+                    ConnectorProvider.SHOPIFY: service.sync_shopify,
+                    ConnectorProvider.SQUARE: service.sync_square,
+                    ConnectorProvider.LIGHTSPEED: service.sync_lightspeed
+                }[provider]
+                try:
+                    await sync(connector_id)
+                except Exception as e:
+                    logger.error("Initial sync failed for connector %s: %s", connector_id, e)
+        
+        task = asyncio.create_task(run_sync())
+        _background_syncs.add(task)
+        task.add_done_callback(_background_syncs.discard)
     
     async def initialize_shopify_oauth(self, shop_domain: str, oauth_code: str, user_id: UUID) -> Connector:
         """
@@ -1026,12 +1598,7 @@ class ConnectorService:
         """
         try:
             # Get user's organization_id
-            from app.models.data_models.User import User
-            user = self.db.exec(select(User).where(User.id == user_id)).first()
-            if not user:
-                raise HTTPException(status_code=404, detail="User not found")
-            
-            organization_id = user.organization_id
+            organization_id = self._get_organization_id(user_id, required=True)
             
             # Shopify OAuth token exchange
             token_url = f"https://{shop_domain}/admin/oauth/access_token"
@@ -1051,24 +1618,29 @@ class ConnectorService:
                 "code": oauth_code
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(token_url, json=payload) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        raise HTTPException(
-                            status_code=400,
-                            detail=f"Shopify OAuth error: {error_text}"
-                        )
-                    
-                    token_data = await response.json()
-                    access_token = token_data.get("access_token")
-                    scope = token_data.get("scope")
-                    
-                    if not access_token:
-                        raise HTTPException(
-                            status_code=400,
-                            detail="Failed to obtain access token from Shopify"
-                        )
+            # End the read transaction left by the user lookups so no pooled connection
+            # sits idle in a transaction during the provider calls below
+            self.db.commit()
+            
+            session = await get_http_session()
+            
+            async with session.post(token_url, json=payload) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Shopify OAuth error: {error_text}"
+                    )
+                
+                token_data = await _read_json(response)
+                access_token = token_data.get("access_token")
+                scope = token_data.get("scope")
+                
+                if not access_token:
+                    raise HTTPException(
+                        status_code=400,
+                        detail="Failed to obtain access token from Shopify"
+                    )
             
             # Create connector with PENDING status and organization_id
             connector = Connector(
@@ -1083,27 +1655,22 @@ class ConnectorService:
                 status="PENDING"
             )
             
+            # Test the connection before touching the database, so no transaction (and
+            # pooled connection) sits open across the provider call; the row is then
+            # written once, with its final status
+            test_result = await self._test_shopify_connection(connector)
+            connector.status = "ACTIVE" if test_result.connection_valid else "ERROR"
             self.db.add(connector)
             self.db.commit()
-            self.db.refresh(connector)
             
-            # Test the connection immediately
-            test_result = await self._test_shopify_connection(connector)
             if test_result.connection_valid:
-                connector.status = "ACTIVE"
-                self.db.add(connector)
-                self.db.commit()
-                
-                # Trigger initial sync
-                await self.sync_shopify(connector.id)
-            else:
-                connector.status = "ERROR"
-                self.db.add(connector)
-                self.db.commit()
+                # Trigger initial sync without holding up the OAuth response
+                self._start_initial_sync(connector.id, connector.provider)
                 
             return connector
             
         except Exception as e:
+            self.db.rollback()
             logger.error(f"Shopify OAuth initialization error: {str(e)}")
             raise HTTPException(status_code=400, detail=str(e))
     
@@ -1113,12 +1680,7 @@ class ConnectorService:
         """
         try:
             # Get user's organization_id
-            from app.models.data_models.User import User
-            user = self.db.exec(select(User).where(User.id == user_id)).first()
-            if not user:
-                raise HTTPException(status_code=404, detail="User not found")
-            
-            organization_id = user.organization_id
+            organization_id = self._get_organization_id(user_id, required=True)
             
             # Square OAuth token exchange
             token_url = "https://connect.squareup.com/oauth2/token"
@@ -1146,25 +1708,30 @@ class ConnectorService:
                 "Square-Version": "2025-04-16"
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(token_url, json=payload, headers=headers) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        raise HTTPException(
-                            status_code=400,
-                            detail=f"Square OAuth error: {error_text}"
-                        )
-                    
-                    token_data = await response.json()
-                    access_token = token_data.get("access_token")
-                    refresh_token = token_data.get("refresh_token")
-                    expires_at = token_data.get("expires_at")
-                    
-                    if not access_token:
-                        raise HTTPException(
-                            status_code=400,
-                            detail="Failed to obtain access token from Square"
-                        )
+            # End the read transaction left by the user lookups so no pooled connection
+            # sits idle in a transaction during the provider calls below
+            self.db.commit()
+            
+            session = await get_http_session()
+            
+            async with session.post(token_url, json=payload, headers=headers) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Square OAuth error: {error_text}"
+                    )
+                
+                token_data = await _read_json(response)
+                access_token = token_data.get("access_token")
+                refresh_token = token_data.get("refresh_token")
+                expires_at = token_data.get("expires_at")
+                
+                if not access_token:
+                    raise HTTPException(
+                        status_code=400,
+                        detail="Failed to obtain access token from Square"
+                    )
             
             # Create connector with organization_id
             connector = Connector(
@@ -1180,27 +1747,22 @@ class ConnectorService:
                 status="PENDING"
             )
             
+            # Test the connection before touching the database, so no transaction (and
+            # pooled connection) sits open across the provider call; the row is then
+            # written once, with its final status
+            test_result = await self._test_square_connection(connector)
+            connector.status = "ACTIVE" if test_result.connection_valid else "ERROR"
             self.db.add(connector)
             self.db.commit()
-            self.db.refresh(connector)
             
-            # Test connection and activate
-            test_result = await self._test_square_connection(connector)
             if test_result.connection_valid:
-                connector.status = "ACTIVE"
-                self.db.add(connector)
-                self.db.commit()
-                
-                # Trigger initial sync
-                await self.sync_square(connector.id)
-            else:
-                connector.status = "ERROR"
-                self.db.add(connector)
-                self.db.commit()
+                # Trigger initial sync without holding up the OAuth response
+                self._start_initial_sync(connector.id, connector.provider)
                 
             return connector
             
         except Exception as e:
+            self.db.rollback()
             logger.error(f"Square OAuth initialization error: {str(e)}")
             raise HTTPException(status_code=400, detail=str(e))
     
@@ -1230,24 +1792,29 @@ class ConnectorService:
                 "grant_type": "authorization_code"
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(token_url, data=payload) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        raise HTTPException(
-                            status_code=400,
-                            detail=f"Lightspeed OAuth error: {error_text}"
-                        )
-                    
-                    token_data = await response.json()
-                    access_token = token_data.get("access_token")
-                    refresh_token = token_data.get("refresh_token")
-                    
-                    if not access_token:
-                        raise HTTPException(
-                            status_code=400,
-                            detail="Failed to obtain access token from Lightspeed"
-                        )
+            # End the read transaction left by the user lookups so no pooled connection
+            # sits idle in a transaction during the provider calls below
+            self.db.commit()
+            
+            session = await get_http_session()
+            
+            async with session.post(token_url, data=payload) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Lightspeed OAuth error: {error_text}"
+                    )
+                
+                token_data = await _read_json(response)
+                access_token = token_data.get("access_token")
+                refresh_token = token_data.get("refresh_token")
+                
+                if not access_token:
+                    raise HTTPException(
+                        status_code=400,
+                        detail="Failed to obtain access token from Lightspeed"
+                    )
             
             # Get account information
             headers = {
@@ -1255,14 +1822,13 @@ class ConnectorService:
                 "Content-Type": "application/json"
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get("https://api.lightspeedapp.com/API/Account.json", headers=headers) as response:
-                    if response.status == 200:
-                        account_data = await response.json()
-                        account_info = account_data.get("Account", {})
-                        account_id = account_info.get("accountID")
-                    else:
-                        account_id = None
+            async with session.get("https://api.lightspeedapp.com/API/Account.json", headers=headers) as response:
+                if response.status == 200:
+                    account_data = await _read_json(response)
+                    account_info = account_data.get("Account", {})
+                    account_id = account_info.get("accountID")
+                else:
+                    account_id = None
             
             # Create connector
             connector = Connector(
@@ -1276,26 +1842,21 @@ class ConnectorService:
                 status="PENDING"
             )
             
+            # Test the connection before touching the database, so no transaction (and
+            # pooled connection) sits open across the provider call; the row is then
+            # written once, with its final status
+            test_result = await self._test_lightspeed_connection(connector)
+            connector.status = "ACTIVE" if test_result.connection_valid else "ERROR"
             self.db.add(connector)
             self.db.commit()
-            self.db.refresh(connector)
             
-            # Test connection and activate
-            test_result = await self._test_lightspeed_connection(connector)
             if test_result.connection_valid:
-                connector.status = "ACTIVE"
-                self.db.add(connector)
-                self.db.commit()
-                
-                # Trigger initial sync
-                await self.sync_lightspeed(connector.id)
-            else:
-                connector.status = "ERROR"
-                self.db.add(connector)
-                self.db.commit()
+                # Trigger initial sync without holding up the OAuth response
+                self._start_initial_sync(connector.id, connector.provider)
                 
             return connector
             
         except Exception as e:
+            self.db.rollback()
             logger.error(f"Lightspeed OAuth initialization error: {str(e)}")
             raise HTTPException(status_code=400, detail=str(e)) 
\ No newline at end of file
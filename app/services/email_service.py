@@ -1,12 +1,216 @@
 import os
+import asyncio
 import logging
-from typing import Dict, List, Optional
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail, To, From, Subject, HtmlContent, PlainTextContent
+import httpx
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from sendgrid.helpers.mail import (
+    Mail, To, From, Subject, HtmlContent, PlainTextContent, Personalization, TemplateId
+)
 from jinja2 import Environment, BaseLoader
 
 logger = logging.getLogger(__name__)
 
+# Static prefix/suffix of the HTML body, kept out of the template so only the
+# per-user middle is rendered
+_HTML_HEAD = """\
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Stock Alert</title>
+    <style>
+        body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+        .container { max-width: 600px; margin: 0 auto; padding: 20px; }
+        .header { background: #f8f9fa; padding: 20px; border-radius: 8px; margin-bottom: 20px; }
+        .alert-section { margin-bottom: 30px; }
+        .alert-urgent { border-left: 4px solid #dc3545; padding-left: 15px; }
+        .alert-warning { border-left: 4px solid #ffc107; padding-left: 15px; }
+        .product-item { background: #f8f9fa; padding: 15px; margin: 10px 0; border-radius: 6px; }
+        .product-sku { font-weight: bold; color: #495057; }
+        .product-name { color: #6c757d; }
+        .stock-info { margin-top: 8px; font-size: 14px; }
+        .urgent { color: #dc3545; font-weight: bold; }
+        .warning { color: #856404; font-weight: bold; }
+        .footer { margin-top: 30px; padding-top: 20px; border-top: 1px solid #dee2e6; font-size: 12px; color: #6c757d; }
+        .btn { display: inline-block; padding: 10px 20px; background: #007bff; color: white; text-decoration: none; border-radius: 4px; margin: 10px 0; }
+    </style>
+</head>
+<body>
+    <div class="container">
+"""
+
+_HTML_FOOT = """\
+
+        <div class="footer">
+            <p>This is an automated alert from Steadi Inventory Management.</p>
+            <p>To manage your notification preferences, visit your dashboard settings.</p>
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+_HTML_SOURCE = """\
+        <div class="header">
+            <h2>📦 Inventory Alert</h2>
+            <p>Hello {{ user_name }},</p>
+            <p>Here's your inventory status update:</p>
+        </div>
+{% macro product_item(alert, level) %}
+            <div class="product-item">
+                <div class="product-sku {{ level }}">{{ alert.get('sku', 'N/A') }}</div>
+                <div class="product-name">{{ alert.get('name', 'N/A') }}</div>
+                <div class="stock-info">
+                    <strong>On Hand:</strong> {{ alert.get('on_hand', 0) }} |
+                    <strong>Reorder Point:</strong> {{ alert.get('reorder_point', 0) }} |
+                    <strong>Days Left:</strong> ~{{ alert.get('days_of_stock', 0) }} days<br>
+                    <strong>Suggested Order:</strong> {{ alert.get('reorder_quantity', 0) }} units
+                    {%- if alert.get('supplier_name') %} | <strong>Supplier:</strong> {{ alert.get('supplier_name') }}{% endif %}
+
+                </div>
+            </div>
+{% endmacro %}
+{% if red_alerts %}
+        <div class="alert-section alert-urgent">
+            <h3>🚨 URGENT - Immediate Action Required ({{ red_alerts|length }} items)</h3>
+            <p>These products are at or below their reorder point and need immediate attention:</p>
+{% for alert in red_alerts %}
+{{ product_item(alert, 'urgent') }}
+{%- endfor %}
+        </div>
+{% endif %}
+{% if yellow_alerts %}
+        <div class="alert-section alert-warning">
+            <h3>⚠️ Warning - Monitor Closely ({{ yellow_alerts|length }} items)</h3>
+            <p>These products are approaching their reorder point:</p>
+{% for alert in yellow_alerts %}
+{{ product_item(alert, 'warning') }}
+{%- endfor %}
+        </div>
+{% endif %}
+        <div style="text-align: center; margin: 30px 0;">
+            <a href="{{ dashboard_url }}" class="btn">
+                View Dashboard
+            </a>
+        </div>
+"""
+
+_TEXT_SOURCE = """\
+INVENTORY ALERT
+
+Hello {{ user_name }},
+
+Here's your inventory status update:
+{% macro product_item(alert) %}
+
+• {{ alert.get('sku', 'N/A') }} - {{ alert.get('name', 'N/A') }}
+  On Hand: {{ alert.get('on_hand', 0) }} | Reorder Point: {{ alert.get('reorder_point', 0) }}
+  Days Left: ~{{ alert.get('days_of_stock', 0) }} days
+  Suggested Order: {{ alert.get('reorder_quantity', 0) }} units
+  Supplier: {{ alert.get('supplier_name', 'Unknown') }}
+{% endmacro %}
+{% if red_alerts %}
+
+🚨 URGENT - Immediate Action Required ({{ red_alerts|length }} items)
+These products are at or below their reorder point:
+{% for alert in red_alerts %}
+{{ product_item(alert) }}
+{%- endfor %}
+{% endif %}
+{% if yellow_alerts %}
+
+⚠️ Warning - Monitor Closely ({{ yellow_alerts|length }} items)
+These products are approaching their reorder point:
+{% for alert in yellow_alerts %}
+{{ product_item(alert) }}
+{%- endfor %}
+{% endif %}
+
+View your full dashboard: {{ dashboard_url }}
+
+---
+This is an automated alert from Steadi Inventory Management.
+To manage your notification preferences, visit your dashboard settings.
+"""
+
+# Templates are compiled once at import; auto_reload=False skips the
+# per-render mtime check. Only the HTML body is escaped.
+_HTML_ENV = Environment(
+    loader=BaseLoader(),
+    autoescape=True,
+    auto_reload=False,
+    cache_size=-1,
+    trim_blocks=True,
+    lstrip_blocks=True,
+    keep_trailing_newline=True,
+)
+_TEXT_ENV = Environment(
+    loader=BaseLoader(),
+    autoescape=False,
+    auto_reload=False,
+    cache_size=-1,
+    trim_blocks=True,
+    lstrip_blocks=True,
+    keep_trailing_newline=True,
+)
+_HTML_TMPL = _HTML_ENV.from_string(_HTML_SOURCE)
+_TEXT_TMPL = _TEXT_ENV.from_string(_TEXT_SOURCE)
+
+def _split_alerts(alerts: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+    """Split alerts into RED and YELLOW lists in a single pass"""
+    red_alerts: List[Dict] = []
+    yellow_alerts: List[Dict] = []
+    for alert in alerts:
+        level = alert.get("alert_level")
+        if level == "RED":
+            red_alerts.append(alert)
+        elif level == "YELLOW":
+            yellow_alerts.append(alert)
+    return red_alerts, yellow_alerts
+
+@lru_cache(maxsize=1024)
+def _subject_for(red_count: int, yellow_count: int) -> str:
+    """Subject line for a (red, yellow) count pair; repeats often within a batch"""
+    if red_count > 0:
+        return f"🚨 URGENT: {red_count} products need immediate reordering"
+    elif yellow_count > 0:
+        return f"⚠️ {yellow_count} products approaching reorder point"
+    else:
+        return "📊 Inventory Status Update"
+
+SENDGRID_API_URL = "https://api.sendgrid.com"
+SENDGRID_MAX_PERSONALIZATIONS = 1000  # SendGrid's per-request recipient cap
+SENDGRID_MAX_CONCURRENT_SENDS = 10
+
+_http_client: Optional[httpx.AsyncClient] = None
+_http_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+async def get_sendgrid_client() -> httpx.AsyncClient:
+    """Shared SendGrid client whose keep-alive pool is reused across sends"""
+    global _http_client, _http_client_loop
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_client.is_closed or _http_client_loop is not loop:
+        _http_client = httpx.AsyncClient(
+            base_url=SENDGRID_API_URL,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=50),
+            timeout=10.0
+        )
+        _http_client_loop = loop
+    return _http_client
+
+
+async def close_sendgrid_client():
+    """Close the shared SendGrid client (called on application shutdown)"""
+    global _http_client, _http_client_loop
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+    _http_client = None
+    _http_client_loop = None
+
+
 class EmailService:
     """Service for sending emails via SendGrid"""
     
@@ -14,14 +218,17 @@ class EmailService:
         self.api_key = os.getenv("SENDGRID_API_KEY")
         self.from_email = os.getenv("FROM_EMAIL", "alerts@steadi.app")
         self.from_name = os.getenv("FROM_NAME", "Steadi Inventory")
+        self.alert_template_id = os.getenv("SENDGRID_ALERT_TEMPLATE_ID")
+        
+        # Constant per process, so resolve once instead of on every render/send
+        self._frontend_url = os.getenv("FRONTEND_URL", "https://app.steadi.com").rstrip("/")
+        self._dashboard_url = f"{self._frontend_url}/dashboard"
+        self._from = From(self.from_email, self.from_name)
         
         if not self.api_key:
             logger.warning("SENDGRID_API_KEY not found in environment variables")
-            self.client = None
-        else:
-            self.client = SendGridAPIClient(api_key=self.api_key)
     
-    def send_stock_alert_email(
+    async def send_stock_alert_email(
         self, 
         to_email: str, 
         user_name: str,
@@ -29,27 +236,13 @@ class EmailService:
         alert_counts: Dict[str, int]
     ) -> bool:
         """Send stock alert email with multiple products"""
-        if not self.client:
+        if not self.api_key:
             logger.error("SendGrid client not initialized - missing API key")
             return False
         
         try:
-            # Generate email content
-            subject = self._generate_subject(alert_counts)
-            html_content = self._generate_html_content(user_name, alerts, alert_counts)
-            plain_content = self._generate_plain_content(user_name, alerts, alert_counts)
-            
-            # Create email
-            message = Mail(
-                from_email=From(self.from_email, self.from_name),
-                to_emails=To(to_email),
-                subject=Subject(subject),
-                html_content=HtmlContent(html_content),
-                plain_text_content=PlainTextContent(plain_content)
-            )
-            
-            # Send email
-            response = self.client.send(message)
+            message = self._build_alert_message(to_email, user_name, alerts, alert_counts)
+            response = await self._post_mail(message.get())
             
             if response.status_code in [200, 201, 202]:
                 logger.info(f"Stock alert email sent successfully to {to_email}")
@@ -62,188 +255,137 @@ class EmailService:
             logger.error(f"Error sending stock alert email: {str(e)}")
             return False
     
-    def _generate_subject(self, alert_counts: Dict[str, int]) -> str:
-        """Generate email subject based on alert counts"""
-        red_count = alert_counts.get("red", 0)
-        yellow_count = alert_counts.get("yellow", 0)
+    async def send_bulk_stock_alerts(
+        self,
+        messages: List[Tuple[str, Dict[str, Any]]]
+    ) -> int:
+        """
+        Send stock alert emails to many recipients at once.
+        
+        Each message is (to_email, context) where context holds user_name, alerts
+        and alert_counts. With SENDGRID_ALERT_TEMPLATE_ID set, recipients are packed
+        into one dynamic-template request per SENDGRID_MAX_PERSONALIZATIONS; otherwise
+        each body is rendered locally and the sends run concurrently, capped at
+        SENDGRID_MAX_CONCURRENT_SENDS. Returns the number of recipients accepted.
+        """
+        if not self.api_key:
+            logger.error("SendGrid client not initialized - missing API key")
+            return 0
+        
+        if not messages:
+            return 0
         
-        if red_count > 0:
-            return f"🚨 URGENT: {red_count} products need immediate reordering"
-        elif yellow_count > 0:
-            return f"⚠️ {yellow_count} products approaching reorder point"
+        if self.alert_template_id:
+            batches = []
+            for i in range(0, len(messages), SENDGRID_MAX_PERSONALIZATIONS):
+                chunk = messages[i:i + SENDGRID_MAX_PERSONALIZATIONS]
+                batches.append((self._build_template_message(chunk).get(), len(chunk)))
         else:
-            return "📊 Inventory Status Update"
+            batches = [
+                (self._build_alert_message(
+                    to_email,
+                    context.get("user_name", ""),
+                    context.get("alerts", []),
+                    context.get("alert_counts", {})
+                ).get(), 1)
+                for to_email, context in messages
+            ]
+        
+        limiter = asyncio.Semaphore(SENDGRID_MAX_CONCURRENT_SENDS)
+        
+        async def send_batch(payload: Dict[str, Any], recipients: int) -> int:
+            async with limiter:
+                try:
+                    response = await self._post_mail(payload)
+                except Exception as e:
+                    logger.error("Error sending bulk stock alert batch: %s", e)
+                    return 0
+            if response.status_code in [200, 201, 202]:
+                return recipients
+            logger.error("Failed to send bulk stock alert batch. Status: %s", response.status_code)
+            return 0
+        
+        sent = sum(await asyncio.gather(*(send_batch(payload, n) for payload, n in batches)))
+        logger.info("Bulk stock alerts sent to %d of %d recipients", sent, len(messages))
+        return sent
+    
+    def _build_alert_message(
+        self,
+        to_email: str,
+        user_name: str,
+        alerts: List[Dict],
+        alert_counts: Dict[str, int]
+    ) -> Mail:
+        """Build a fully rendered stock alert email for one recipient"""
+        # Bucket once; both bodies render from the same split
+        red_alerts, yellow_alerts = _split_alerts(alerts)
+        return Mail(
+            from_email=self._from,
+            to_emails=To(to_email),
+            subject=Subject(self._generate_subject(alert_counts)),
+            html_content=HtmlContent(self._generate_html_content(user_name, red_alerts, yellow_alerts)),
+            plain_text_content=PlainTextContent(self._generate_plain_content(user_name, red_alerts, yellow_alerts))
+        )
+    
+    def _build_template_message(self, messages: List[Tuple[str, Dict[str, Any]]]) -> Mail:
+        """Build one dynamic-template email with a personalization per recipient"""
+        message = Mail(from_email=self._from)
+        message.template_id = TemplateId(self.alert_template_id)
+        
+        for to_email, context in messages:
+            alert_counts = context.get("alert_counts", {})
+            red_alerts, yellow_alerts = _split_alerts(context.get("alerts", []))
+            personalization = Personalization()
+            personalization.add_to(To(to_email))
+            personalization.dynamic_template_data = {
+                "subject": self._generate_subject(alert_counts),
+                "user_name": context.get("user_name", ""),
+                "red_alerts": red_alerts,
+                "yellow_alerts": yellow_alerts,
+                "dashboard_url": self._dashboard_url
+            }
+            message.add_personalization(personalization)
+        
+        return message
+    
+    async def _post_mail(self, payload: Dict[str, Any]) -> httpx.Response:
+        """POST a mail payload over the shared keep-alive connection"""
+        client = await get_sendgrid_client()
+        return await client.post(
+            "/v3/mail/send",
+            json=payload,
+            headers={"Authorization": f"Bearer {self.api_key}"}
+        )
+    
+    def _generate_subject(self, alert_counts: Dict[str, int]) -> str:
+        """Generate email subject based on alert counts"""
+        return _subject_for(alert_counts.get("red", 0), alert_counts.get("yellow", 0))
     
     def _generate_html_content(
         self, 
         user_name: str, 
-        alerts: List[Dict], 
-        alert_counts: Dict[str, int]
+        red_alerts: List[Dict], 
+        yellow_alerts: List[Dict]
     ) -> str:
         """Generate HTML email content"""
-        
-        red_alerts = [alert for alert in alerts if alert.get("alert_level") == "RED"]
-        yellow_alerts = [alert for alert in alerts if alert.get("alert_level") == "YELLOW"]
-        
-        html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>Stock Alert</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: #f8f9fa; padding: 20px; border-radius: 8px; margin-bottom: 20px; }}
-                .alert-section {{ margin-bottom: 30px; }}
-                .alert-urgent {{ border-left: 4px solid #dc3545; padding-left: 15px; }}
-                .alert-warning {{ border-left: 4px solid #ffc107; padding-left: 15px; }}
-                .product-item {{ background: #f8f9fa; padding: 15px; margin: 10px 0; border-radius: 6px; }}
-                .product-sku {{ font-weight: bold; color: #495057; }}
-                .product-name {{ color: #6c757d; }}
-                .stock-info {{ margin-top: 8px; font-size: 14px; }}
-                .urgent {{ color: #dc3545; font-weight: bold; }}
-                .warning {{ color: #856404; font-weight: bold; }}
-                .footer {{ margin-top: 30px; padding-top: 20px; border-top: 1px solid #dee2e6; font-size: 12px; color: #6c757d; }}
-                .btn {{ display: inline-block; padding: 10px 20px; background: #007bff; color: white; text-decoration: none; border-radius: 4px; margin: 10px 0; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h2>📦 Inventory Alert</h2>
-                    <p>Hello {user_name},</p>
-                    <p>Here's your inventory status update:</p>
-                </div>
-        """
-        
-        if red_alerts:
-            html += f"""
-                <div class="alert-section alert-urgent">
-                    <h3>🚨 URGENT - Immediate Action Required ({len(red_alerts)} items)</h3>
-                    <p>These products are at or below their reorder point and need immediate attention:</p>
-            """
-            
-            for alert in red_alerts:
-                html += f"""
-                    <div class="product-item">
-                        <div class="product-sku urgent">{alert.get('sku', 'N/A')}</div>
-                        <div class="product-name">{alert.get('name', 'N/A')}</div>
-                        <div class="stock-info">
-                            <strong>On Hand:</strong> {alert.get('on_hand', 0)} | 
-                            <strong>Reorder Point:</strong> {alert.get('reorder_point', 0)} | 
-                            <strong>Days Left:</strong> ~{alert.get('days_of_stock', 0)} days<br>
-                            <strong>Suggested Order:</strong> {alert.get('reorder_quantity', 0)} units
-                            {f" | <strong>Supplier:</strong> {alert.get('supplier_name', 'Unknown')}" if alert.get('supplier_name') else ""}
-                        </div>
-                    </div>
-                """
-            
-            html += "</div>"
-        
-        if yellow_alerts:
-            html += f"""
-                <div class="alert-section alert-warning">
-                    <h3>⚠️ Warning - Monitor Closely ({len(yellow_alerts)} items)</h3>
-                    <p>These products are approaching their reorder point:</p>
-            """
-            
-            for alert in yellow_alerts:
-                html += f"""
-                    <div class="product-item">
-                        <div class="product-sku warning">{alert.get('sku', 'N/A')}</div>
-                        <div class="product-name">{alert.get('name', 'N/A')}</div>
-                        <div class="stock-info">
-                            <strong>On Hand:</strong> {alert.get('on_hand', 0)} | 
-                            <strong>Reorder Point:</strong> {alert.get('reorder_point', 0)} | 
-                            <strong>Days Left:</strong> ~{alert.get('days_of_stock', 0)} days<br>
-                            <strong>Suggested Order:</strong> {alert.get('reorder_quantity', 0)} units
-                            {f" | <strong>Supplier:</strong> {alert.get('supplier_name', 'Unknown')}" if alert.get('supplier_name') else ""}
-                        </div>
-                    </div>
-                """
-            
-            html += "</div>"
-        
-        html += f"""
-                <div style="text-align: center; margin: 30px 0;">
-                    <a href="{os.getenv('FRONTEND_URL', 'https://app.steadi.com')}/dashboard" class="btn">
-                        View Dashboard
-                    </a>
-                </div>
-                
-                <div class="footer">
-                    <p>This is an automated alert from Steadi Inventory Management.</p>
-                    <p>To manage your notification preferences, visit your dashboard settings.</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        return html
+        body = _HTML_TMPL.render(
+            user_name=user_name,
+            red_alerts=red_alerts,
+            yellow_alerts=yellow_alerts,
+            dashboard_url=self._dashboard_url
+        )
+        return "".join((_HTML_HEAD, body, _HTML_FOOT))
     
     def _generate_plain_content(
         self, 
         user_name: str, 
-        alerts: List[Dict], 
-        alert_counts: Dict[str, int]
+        red_alerts: List[Dict], 
+        yellow_alerts: List[Dict]
     ) -> str:
         """Generate plain text email content"""
-        
-        red_alerts = [alert for alert in alerts if alert.get("alert_level") == "RED"]
-        yellow_alerts = [alert for alert in alerts if alert.get("alert_level") == "YELLOW"]
-        
-        content = f"""
-INVENTORY ALERT
-
-Hello {user_name},
-
-Here's your inventory status update:
-"""
-        
-        if red_alerts:
-            content += f"""
-
-🚨 URGENT - Immediate Action Required ({len(red_alerts)} items)
-These products are at or below their reorder point:
-
-"""
-            for alert in red_alerts:
-                content += f"""
-• {alert.get('sku', 'N/A')} - {alert.get('name', 'N/A')}
-  On Hand: {alert.get('on_hand', 0)} | Reorder Point: {alert.get('reorder_point', 0)}
-  Days Left: ~{alert.get('days_of_stock', 0)} days
-  Suggested Order: {alert.get('reorder_quantity', 0)} units
-  Supplier: {alert.get('supplier_name', 'Unknown')}
-
-"""
-        
-        if yellow_alerts:
-            content += f"""
-
-⚠️ Warning - Monitor Closely ({len(yellow_alerts)} items)
-These products are approaching their reorder point:
-
-"""
-            for alert in yellow_alerts:
-                content += f"""
-• {alert.get('sku', 'N/A')} - {alert.get('name', 'N/A')}
-  On Hand: {alert.get('on_hand', 0)} | Reorder Point: {alert.get('reorder_point', 0)}
-  Days Left: ~{alert.get('days_of_stock', 0)} days
-  Suggested Order: {alert.get('reorder_quantity', 0)} units
-  Supplier: {alert.get('supplier_name', 'Unknown')}
-
-"""
-        
-        content += f"""
-
-View your full dashboard: {os.getenv('FRONTEND_URL', 'https://app.steadi.com')}/dashboard
-
----
-This is an automated alert from Steadi Inventory Management.
-To manage your notification preferences, visit your dashboard settings.
-"""
-        
-        return content 
\ No newline at end of file
+        return _TEXT_TMPL.render(
+            user_name=user_name,
+            red_alerts=red_alerts,
+            yellow_alerts=yellow_alerts,
+            dashboard_url=self._dashboard_url
+        )
@@ -1,61 +1,112 @@
-from typing import Optional, List, Dict, Union
+from typing import Optional, Iterator, List, Dict, Tuple, Union
 from uuid import UUID, uuid4
 from datetime import datetime
 
 from sqlmodel import Session, select
-from sqlalchemy.orm import Session as SQLAlchemySession
-from sqlalchemy import or_
+from sqlalchemy import func, or_
 
 from app.models.data_models.Product import Product
 from app.models.data_models.InventoryLedger import InventoryLedger
 
-from app.db.database import get_db, engine
+LEDGER_STREAM_BATCH_SIZE = 1000
 
 
-def get_session():
-    """Create a session for direct use in service functions"""
-    session = SQLAlchemySession(engine)
-    try:
-        yield session
-    finally:
-        session.close()
+def update_inventory(session: Session, sku: str, quantity_delta: int, source: str, reference_id: Optional[str] = None, user_id: UUID = None) -> Product:
+    """Update inventory levels with audit trail"""
+    statement = select(Product).where(Product.sku == sku)
+    
+    if user_id:
+        statement = statement.where(Product.user_id == user_id)
+        
+    result = session.execute(statement)
+    product = result.scalar_one_or_none()
+    
+    if not product:
+        raise ValueError(f"Product with SKU {sku} not found")
+    
+    new_quantity = product.on_hand + quantity_delta
+    if new_quantity < 0:
+        raise ValueError(f"Inventory for SKU {sku} cannot be negative")
+    product.on_hand = new_quantity
+    
+    ledger_entry = InventoryLedger(
+        id=uuid4(),
+        product_id=product.id,
+        quantity_delta=quantity_delta,
+        quantity_after=new_quantity,
+        source=source,
+        reference_id=reference_id
+    )
+    # product is already tracked, so its change is flushed with the new ledger row
+    session.add(ledger_entry)
+    session.commit()
+    return product
 
 
-def update_inventory(sku: str, quantity_delta: int, source: str, reference_id: Optional[str] = None, user_id: UUID = None) -> Product:
-    """Update inventory levels with audit trail"""
-    with next(get_session()) as session:
-        statement = select(Product).where(Product.sku == sku)
+def update_inventory_bulk(
+    session: Session,
+    items: List[Tuple[str, int, str, Optional[str]]],
+    user_id: UUID
+) -> List[Product]:
+    """
+    Apply several inventory adjustments with one lookup and one commit.
+    
+    Args:
+        session: Request-scoped database session
+        items: (sku, quantity_delta, source, reference_id) per adjustment; a SKU
+            may appear more than once and its deltas apply in order
+        user_id: Owner of the products being adjusted
         
-        if user_id:
-            statement = statement.where(Product.user_id == user_id)
-            
-        result = session.execute(statement)
-        product = result.scalar_one_or_none()
+    Returns:
+        The adjusted products, in order of first appearance
         
-        if not product:
-            raise ValueError(f"Product with SKU {sku} not found")
+    Raises:
+        ValueError: listing every SKU that is missing or would go negative;
+            nothing is written in that case
+    """
+    skus = list(dict.fromkeys(sku for sku, _, _, _ in items))
+    if not skus:
+        return []
+    
+    statement = select(Product).where(Product.user_id == user_id, Product.sku.in_(skus))
+    products = {product.sku: product for product in session.execute(statement).scalars()}
+    
+    errors = []
+    ledger_entries = []
+    for sku, quantity_delta, source, reference_id in items:
+        product = products.get(sku)
+        if product is None:
+            errors.append(f"Product with SKU {sku} not found")
+            continue
         
         new_quantity = product.on_hand + quantity_delta
         if new_quantity < 0:
-            raise ValueError(f"Inventory for SKU {sku} cannot be negative")
+            errors.append(f"Inventory for SKU {sku} cannot be negative")
+            continue
         product.on_hand = new_quantity
         
-        ledger_entry = InventoryLedger(
+        ledger_entries.append(InventoryLedger(
             id=uuid4(),
             product_id=product.id,
             quantity_delta=quantity_delta,
             quantity_after=new_quantity,
             source=source,
             reference_id=reference_id
-        )
-        session.add(ledger_entry)
-        session.add(product)
-        session.commit()
-        session.refresh(product)
-        return product
+        ))
+    
+    if errors:
+        # Discard the in-memory on_hand changes made before the failure
+        session.rollback()
+        raise ValueError("; ".join(errors))
+    
+    # Product changes flush as one batched UPDATE alongside the ledger inserts
+    session.add_all(ledger_entries)
+    session.commit()
+    return [products[sku] for sku in skus]
 
 
 def get_inventory(
+    session: Session,
     search: Optional[str] = None, 
     page: int = 1, 
     limit: int = 50, 
@@ -66,6 +117,7 @@ def get_inventory(
     Get paginated inventory with search.
     
     Args:
+        session: Request-scoped database session
         search: Optional search text for SKU or product name
         page: Page number (1-indexed)
         limit: Number of items per page
@@ -75,46 +127,66 @@ def get_inventory(
     Returns:
         Dictionary with items and total count
     """
-    with next(get_session()) as session:
-        statement = select(Product)
-        
+    def _apply_filters(stmt):
         # Apply either single user_id or multiple user_ids filter
         if user_ids:
-            statement = statement.where(Product.user_id.in_(user_ids))
-        elif user_id:
-            statement = statement.where(Product.user_id == user_id)
-            
-        if search:
-            search_pattern = f"%{search}%"
-            statement = statement.where(
-                (Product.sku.ilike(search_pattern)) | (Product.name.ilike(search_pattern))
-            )
-        
-        offset = (page - 1) * limit
-        
-        # Count total records with the same filters (except pagination)
-        total_statement = select(Product)
-        if user_ids:
-            total_statement = total_statement.where(Product.user_id.in_(user_ids))
+            stmt = stmt.where(Product.user_id.in_(user_ids))
         elif user_id:
-            total_statement = total_statement.where(Product.user_id == user_id)
+            stmt = stmt.where(Product.user_id == user_id)
             
         if search:
             search_pattern = f"%{search}%"
-            total_statement = total_statement.where(
+            stmt = stmt.where(
                 (Product.sku.ilike(search_pattern)) | (Product.name.ilike(search_pattern))
             )
-            
-        total = len(session.execute(total_statement).scalars().all())
-        
-        # Apply pagination to main query
-        statement = statement.offset(offset).limit(limit)
-        
-        results = session.execute(statement).scalars().all()
-        return {"items": results, "total": total}
+        return stmt
+    
+    offset = (page - 1) * limit
+    
+    # COUNT(*) OVER () carries the unpaginated total on every page row
+    statement = _apply_filters(
+        select(Product, func.count().over().label("total"))
+    ).offset(offset).limit(limit)
+    rows = session.execute(statement).all()
+    
+    if rows:
+        total = rows[0].total
+    elif offset:
+        # Past the last page there are no rows to carry the total
+        count_statement = _apply_filters(select(func.count()).select_from(Product))
+        total = session.execute(count_statement).scalar_one()
+    else:
+        total = 0
+    
+    return {"items": [row[0] for row in rows], "total": total}
+
+
+def _ledger_statement(
+    product_id: UUID,
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    user_id: Optional[UUID],
+    user_ids: Optional[List[UUID]]
+):
+    """Build the ownership-checked ledger query shared by get_ledger and stream_ledger"""
+    # Joining Product applies the ownership check in the same query; a product
+    # outside the user/organization simply yields no rows
+    statement = select(InventoryLedger).join(
+        Product, Product.id == InventoryLedger.product_id
+    ).where(InventoryLedger.product_id == product_id)
+    if user_ids:
+        statement = statement.where(Product.user_id.in_(user_ids))
+    elif user_id:
+        statement = statement.where(Product.user_id == user_id)
+    if start_date:
+        statement = statement.where(InventoryLedger.timestamp >= start_date)
+    if end_date:
+        statement = statement.where(InventoryLedger.timestamp <= end_date)
+    return statement
 
 
 def get_ledger(
+    session: Session,
     product_id: UUID, 
     start_date: Optional[datetime] = None, 
     end_date: Optional[datetime] = None, 
@@ -125,6 +197,7 @@ def get_ledger(
     Get inventory audit trail for a product.
     
     Args:
+        session: Request-scoped database session
         product_id: ID of the product to get ledger for
         start_date: Optional start date for filtering
         end_date: Optional end date for filtering
@@ -134,29 +207,32 @@ def get_ledger(
     Returns:
         List of inventory ledger entries
     """
-    with next(get_session()) as session:
-        # Check product exists and belongs to user/organization
-        if user_ids:
-            product = session.execute(select(Product).where(
-                (Product.id == product_id) & (Product.user_id.in_(user_ids))
-            )).scalar_one_or_none()
-        elif user_id:
-            product = session.execute(select(Product).where(
-                (Product.id == product_id) & (Product.user_id == user_id)
-            )).scalar_one_or_none()
-        else:
-            product = session.execute(select(Product).where(
-                Product.id == product_id
-            )).scalar_one_or_none()
-            
-        if not product:
-            return []
-        
-        statement = select(InventoryLedger).where(InventoryLedger.product_id == product_id)
-        if start_date:
-            statement = statement.where(InventoryLedger.timestamp >= start_date)
-        if end_date:
-            statement = statement.where(InventoryLedger.timestamp <= end_date)
-        
-        results = session.execute(statement).scalars().all()
-        return results 
\ No newline at end of file
+    statement = _ledger_statement(product_id, start_date, end_date, user_id, user_ids)
+    results = session.execute(statement).scalars().all()
+    return results
+
+
+def stream_ledger(
+    session: Session,
+    product_id: UUID, 
+    start_date: Optional[datetime] = None, 
+    end_date: Optional[datetime] = None, 
+    user_id: UUID = None,
+    user_ids: List[UUID] = None
+) -> Iterator[InventoryLedger]:
+    """
+    Stream the inventory audit trail for a product in batches.
+    
+    Same filtering as get_ledger, but rows are fetched LEDGER_STREAM_BATCH_SIZE
+    at a time and each batch is expunged from the session once consumed, so
+    memory stays flat for exports over long histories.
+    """
+    statement = _ledger_statement(
+        product_id, start_date, end_date, user_id, user_ids
+    ).execution_options(yield_per=LEDGER_STREAM_BATCH_SIZE)
+    
+    for batch in session.execute(statement).scalars().partitions():
+        yield from batch
+        for entry in batch:
+            session.expunge(entry)
+ 
\ No newline at end of file
@@ -1,69 +1,117 @@
 import time
 import logging
-from typing import Dict, Optional
-from collections import defaultdict, deque
+import threading
+from typing import Callable, Dict, List, Optional
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+RATE_LIMIT_SHARDS = 16  # Power of two so the shard index is a bit mask
+
+def _new_state(bucket: int, count: int = 0) -> Dict[str, float]:
+    """Counters for the current and previous fixed window of one tenant"""
+    return {"bucket": bucket, "count": count, "prev_count": 0}
+
 class RateLimitService:
     """In-memory rate limiting service for notifications"""
     
-    def __init__(self, max_requests: int = 100, window_minutes: int = 1):
+    def __init__(
+        self,
+        max_requests: int = 100,
+        window_minutes: int = 1,
+        clock: Callable[[], float] = time.monotonic
+    ):
         self.max_requests = max_requests
         self.window_seconds = window_minutes * 60
-        # Store request timestamps per tenant
-        self._request_history: Dict[str, deque] = defaultdict(deque)
-        
+        # Monotonic by default so wall-clock (NTP) adjustments can't shift windows;
+        # injectable so tests can control time
+        self._clock = clock
+        # Sliding-window counters per tenant: O(1) memory regardless of traffic.
+        # Tenants are sharded by hash so concurrent checks only contend per shard.
+        self._shards: List[Dict[str, Dict[str, float]]] = [
+            {} for _ in range(RATE_LIMIT_SHARDS)
+        ]
+        self._locks = [threading.Lock() for _ in range(RATE_LIMIT_SHARDS)]
+    
+    def _shard_index(self, tenant_id: str) -> int:
+        return hash(tenant_id) & (RATE_LIMIT_SHARDS - 1)
+    
+    def _roll(self, state: Dict[str, float], bucket: int) -> None:
+        """Shift the counters forward when the fixed window has moved on"""
+        if bucket != state["bucket"]:
+            state["prev_count"] = state["count"] if bucket == state["bucket"] + 1 else 0
+            state["count"] = 0
+            state["bucket"] = bucket
+    
+    def _estimate(self, state: Dict[str, float], current_time: float) -> float:
+        """
+        Approximate requests in the last window_seconds: the previous window's
+        count weighted by how much of it still overlaps, plus the current count.
+        """
+        elapsed = current_time - state["bucket"] * self.window_seconds
+        weight = (self.window_seconds - elapsed) / self.window_seconds
+        return state["prev_count"] * weight + state["count"]
+    
     def check_rate_limit(self, tenant_id: str) -> bool:
         """
         Check if tenant is within rate limit.
         Returns True if request is allowed, False if rate limited.
         """
-        current_time = time.time()
-        window_start = current_time - self.window_seconds
+        current_time = self._clock()
+        bucket = int(current_time // self.window_seconds)
         
-        # Get or create request history for this tenant
-        history = self._request_history[tenant_id]
-        
-        # Remove old requests outside the window
-        while history and history[0] < window_start:
-            history.popleft()
+        shard_idx = self._shard_index(tenant_id)
+        shard = self._shards[shard_idx]
+        with self._locks[shard_idx]:
+            state = shard.get(tenant_id)
+            if state is None:
+                # First request from this tenant: nothing to roll or estimate
+                requests_made = 0
+                allowed = self.max_requests > 0
+                if allowed:
+                    shard[tenant_id] = _new_state(bucket, count=1)
+            else:
+                self._roll(state, bucket)
+                requests_made = self._estimate(state, current_time)
+                allowed = requests_made < self.max_requests
+                if allowed:
+                    state["count"] += 1
         
         # Check if we're at the limit
-        if len(history) >= self.max_requests:
+        if not allowed:
             logger.warning(
-                f"Rate limit exceeded for tenant {tenant_id}: "
-                f"{len(history)} requests in last {self.window_seconds}s"
+                "Rate limit exceeded for tenant %s: ~%d requests in last %ss",
+                tenant_id, requests_made, self.window_seconds
             )
             return False
         
-        # Add current request to history
-        history.append(current_time)
-        
         logger.debug(
-            f"Rate limit check passed for tenant {tenant_id}: "
-            f"{len(history)}/{self.max_requests} requests in window"
+            "Rate limit check passed for tenant %s: ~%d/%d requests in window",
+            tenant_id, requests_made + 1, self.max_requests
         )
         
         return True
     
     def get_rate_limit_status(self, tenant_id: str) -> Dict[str, any]:
         """Get current rate limit status for a tenant"""
-        current_time = time.time()
-        window_start = current_time - self.window_seconds
+        current_time = self._clock()
+        bucket = int(current_time // self.window_seconds)
         
-        history = self._request_history[tenant_id]
+        shard_idx = self._shard_index(tenant_id)
+        with self._locks[shard_idx]:
+            # Status reads never create state for unknown tenants
+            state = self._shards[shard_idx].get(tenant_id)
+            if state is None:
+                current_requests = 0
+            else:
+                self._roll(state, bucket)
+                current_requests = int(self._estimate(state, current_time))
         
-        # Count requests in current window
-        current_requests = sum(1 for timestamp in history if timestamp >= window_start)
-        
-        # Calculate reset time (when oldest request will expire)
+        # The estimate next drops when the current fixed window ends; reported
+        # as a wall-clock timestamp since the window clock has no fixed epoch
         reset_time = None
-        if history:
-            oldest_in_window = next((t for t in history if t >= window_start), None)
-            if oldest_in_window:
-                reset_time = oldest_in_window + self.window_seconds
+        if current_requests:
+            reset_time = time.time() + (bucket + 1) * self.window_seconds - current_time
         
         return {
             "requests_made": current_requests,
@@ -76,31 +124,32 @@ class RateLimitService:
     
     def reset_tenant_limit(self, tenant_id: str) -> None:
         """Reset rate limit for a specific tenant (admin function)"""
-        if tenant_id in self._request_history:
-            self._request_history[tenant_id].clear()
+        shard_idx = self._shard_index(tenant_id)
+        with self._locks[shard_idx]:
+            removed = self._shards[shard_idx].pop(tenant_id, None)
+        if removed is not None:
             logger.info(f"Rate limit reset for tenant {tenant_id}")
     
     def cleanup_old_entries(self) -> None:
         """Clean up old entries to prevent memory leaks"""
-        current_time = time.time()
-        window_start = current_time - self.window_seconds
-        
-        tenants_to_remove = []
-        
-        for tenant_id, history in self._request_history.items():
-            # Remove old requests
-            while history and history[0] < window_start:
-                history.popleft()
-            
-            # If no recent requests, remove tenant entirely
-            if not history:
-                tenants_to_remove.append(tenant_id)
+        bucket = int(self._clock() // self.window_seconds)
         
-        for tenant_id in tenants_to_remove:
-            del self._request_history[tenant_id]
+        removed = 0
+        # Sweep one shard at a time so a cleanup never blocks every tenant
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                # A tenant idle for two full windows contributes nothing to any estimate
+                tenants_to_remove = [
+                    tenant_id
+                    for tenant_id, state in shard.items()
+                    if bucket - state["bucket"] > 1
+                ]
+                for tenant_id in tenants_to_remove:
+                    del shard[tenant_id]
+            removed += len(tenants_to_remove)
         
-        if tenants_to_remove:
-            logger.debug(f"Cleaned up rate limit data for {len(tenants_to_remove)} inactive tenants")
+        if removed:
+            logger.debug("Cleaned up rate limit data for %d inactive tenants", removed)
 
 # Global rate limiter instance
-rate_limiter = RateLimitService(max_requests=100, window_minutes=1) 
\ No newline at end of file
+rate_limiter = RateLimitService(max_requests=100, window_minutes=1)
@@ -0,0 +1,19 @@
+import os
+
+# Minimum bcrypt cost for test signups/logins; must be set before the app is imported
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+import httpx
+import pytest
+
+from app.main import app
+
+@pytest.fixture(scope="module")
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture(scope="module")
+async def aclient(anyio_backend):
+    """Async client that calls the app in-process, without TestClient's thread portal"""
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+        yield c
@@ -4,141 +4,119 @@ from app.main import app
 from uuid import uuid4
 import os
 
-client = TestClient(app)
+@pytest.fixture(scope="session")
+def client():
+    """Share one TestClient across the session so app startup and its connection pool are reused"""
+    # Unlike test_connectors' bare_client, this runs the lifespan against the configured database
+    with TestClient(app) as c:
+        yield c
 
-@pytest.fixture
-def auth_headers():
-    """Create a fixture to generate auth headers with test user token"""
-    # First, create a test user if it doesn't exist
-    signup_data = {
-        "email": "test-owner@steadi.app",
-        "password": "Test1234!",
-        "role": "OWNER"
-    }
-    
-    # Try to sign up (will fail if user already exists)
-    signup_response = client.post("/auth/signup", json=signup_data)
-    
-    # Login and get token
-    login_data = {
-        "username": signup_data["email"],
-        "password": signup_data["password"]
-    }
-    login_response = client.post("/auth/login", data=login_data)
-    
-    assert login_response.status_code == 200
-    token = login_response.json()["access_token"]
-    
-    # Return auth headers
-    return {"Authorization": f"Bearer {token}"}
+TEST_PASSWORD = "Test1234!"
+OWNER_EMAIL = "test-owner@steadi.app"
+OWNER2_EMAIL = "test-owner2@steadi.app"
+STAFF_EMAIL = "test-staff@steadi.app"
 
-@pytest.fixture
-def auth_headers_user2():
-    """Create a fixture for a second owner user to test data isolation"""
-    # Create a second test user
-    signup_data = {
-        "email": "test-owner2@steadi.app",
-        "password": "Test1234!",
-        "role": "OWNER"
-    }
-    
-    # Try to sign up
-    signup_response = client.post("/auth/signup", json=signup_data)
-    
-    # Login and get token
-    login_data = {
-        "username": signup_data["email"],
-        "password": signup_data["password"]
-    }
-    login_response = client.post("/auth/login", data=login_data)
-    
-    assert login_response.status_code == 200
-    token = login_response.json()["access_token"]
-    
-    # Return auth headers
-    return {"Authorization": f"Bearer {token}"}
+@pytest.fixture(scope="session")
+def make_auth(client):
+    """Factory that signs up and logs in a test user once per email and returns its auth headers"""
+    cache = {}
+    
+    def _make(email, role="OWNER"):
+        if email in cache:
+            return cache[email]
+        
+        # Try to sign up (will fail if user already exists)
+        client.post("/auth/signup", json={"email": email, "password": TEST_PASSWORD, "role": role})
+        
+        # Login and get token
+        login_response = client.post("/auth/login", data={"username": email, "password": TEST_PASSWORD})
+        assert login_response.status_code == 200
+        
+        cache[email] = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+        return cache[email]
+    
+    return _make
+
+UNAUTH_PRODUCT = {
+    "sku": f"TEST-{uuid4()}",
+    "name": "Test Product",
+    "supplier_id": str(uuid4()),
+    "cost": 10.0,
+    "on_hand": 5,
+    "reorder_point": 2
+}
+
+# (method, path, json body, query params) for every inventory endpoint
+UNAUTH_CASES = [
+    ("GET", "/api/inventory", None, None),
+    ("GET", "/api/inventory/TEST-SKU", None, None),
+    ("POST", "/api/inventory", UNAUTH_PRODUCT, None),
+    ("PATCH", "/api/inventory/TEST-SKU", {"reorder_point": 10}, None),
+    ("POST", "/api/inventory/TEST-SKU/adjust", None, {"quantity_delta": 5}),
+    ("GET", f"/api/inventory/ledger/{uuid4()}", None, None),
+]
 
 @pytest.fixture
-def staff_auth_headers():
-    """Create a fixture to generate auth headers with staff role (lower privileges)"""
-    # Create a test staff user
-    signup_data = {
-        "email": "test-staff@steadi.app",
-        "password": "Test1234!",
-        "role": "STAFF"
-    }
-    
-    # Try to sign up
-    signup_response = client.post("/auth/signup", json=signup_data)
-    
-    # Login and get token
-    login_data = {
-        "username": signup_data["email"],
-        "password": signup_data["password"]
+def unique_sku():
+    """A fresh SKU per test, only for tests that actually create products"""
+    return f"TEST-{uuid4()}"
+
+@pytest.fixture(scope="module")
+def shared_supplier(client, make_auth):
+    """Create (or reuse) one supplier for the module and return its id"""
+    auth_headers = make_auth(OWNER_EMAIL)
+    # Create a supplier for testing
+    supplier_data = {
+        "name": "Test Supplier",
+        "contact_email": "supplier@test.com",
+        "lead_time_days": 7
     }
-    login_response = client.post("/auth/login", data=login_data)
     
-    assert login_response.status_code == 200
-    token = login_response.json()["access_token"]
+    # First, create a supplier (this might fail if already exists)
+    try:
+        supplier_response = client.post("/api/suppliers", json=supplier_data, headers=auth_headers)
+        supplier_id = supplier_response.json().get("id")
+    except:
+        # If failed, get existing supplier
+        suppliers_response = client.get("/api/suppliers", headers=auth_headers)
+        if suppliers_response.status_code == 200 and len(suppliers_response.json().get("items", [])) > 0:
+            supplier_id = suppliers_response.json()["items"][0]["id"]
+        else:
+            pytest.skip("Test requires a supplier to be available")
     
-    # Return auth headers
-    return {"Authorization": f"Bearer {token}"}
+    return supplier_id
 
-def test_inventory_endpoints_without_auth():
+@pytest.mark.parametrize("method,path,payload,params", UNAUTH_CASES)
+def test_inventory_endpoints_without_auth(client, method, path, payload, params):
     """Test that inventory endpoints return 401 without authentication"""
-    # Test GET /api/inventory
-    response = client.get("/api/inventory")
-    assert response.status_code == 401
-    
-    # Test GET /api/inventory/{sku}
-    response = client.get("/api/inventory/TEST-SKU")
-    assert response.status_code == 401
-    
-    # Test POST /api/inventory
-    test_product = {
-        "sku": f"TEST-{uuid4()}",
-        "name": "Test Product",
-        "supplier_id": str(uuid4()),
-        "cost": 10.0,
-        "on_hand": 5,
-        "reorder_point": 2
-    }
-    response = client.post("/api/inventory", json=test_product)
-    assert response.status_code == 401
-    
-    # Test PATCH /api/inventory/{sku}
-    update_data = {"reorder_point": 10}
-    response = client.patch("/api/inventory/TEST-SKU", json=update_data)
-    assert response.status_code == 401
-    
-    # Test POST /api/inventory/{sku}/adjust
-    adjust_data = {"quantity_delta": 5}
-    response = client.post("/api/inventory/TEST-SKU/adjust", params=adjust_data)
-    assert response.status_code == 401
-    
-    # Test GET /api/inventory/ledger/{product_id}
-    response = client.get(f"/api/inventory/ledger/{uuid4()}")
+    response = client.request(method, path, json=payload, params=params)
     assert response.status_code == 401
 
-def test_inventory_endpoints_with_auth(auth_headers):
+@pytest.mark.anyio
+async def test_inventory_endpoints_with_auth(aclient, make_auth):
     """Test that inventory endpoints work with proper authentication"""
+    auth_headers = make_auth(OWNER_EMAIL)
+    
     # Test GET /api/inventory
-    response = client.get("/api/inventory", headers=auth_headers)
+    response = await aclient.get("/api/inventory", headers=auth_headers)
     assert response.status_code == 200
     assert "items" in response.json()
     
     # Other tests would follow similar pattern, but would need valid IDs
     # For a complete test suite, you would need to create test data first
 
-def test_inventory_role_based_access(staff_auth_headers, auth_headers):
+def test_inventory_role_based_access(client, make_auth, unique_sku):
     """Test that inventory endpoints respect role-based access control"""
+    auth_headers = make_auth(OWNER_EMAIL)
+    staff_auth_headers = make_auth(STAFF_EMAIL, "STAFF")
+    
     # Staff should be able to view inventory
     response = client.get("/api/inventory", headers=staff_auth_headers)
     assert response.status_code == 200
     
     # Staff should NOT be able to create products
     test_product = {
-        "sku": f"TEST-{uuid4()}",
+        "sku": unique_sku,
         "name": "Test Product",
         "supplier_id": str(uuid4()),
         "cost": 10.0,
@@ -153,33 +131,17 @@ def test_inventory_role_based_access(staff_auth_headers, auth_headers):
     # This might fail with 400 if supplier_id doesn't exist, which is fine for this test
     assert response.status_code != 401 and response.status_code != 403
 
-def test_data_isolation_between_users(auth_headers, auth_headers_user2):
+def test_data_isolation_between_users(client, make_auth, shared_supplier, unique_sku):
     """Test that users can only access their own data"""
-    # Create a supplier for testing
-    supplier_data = {
-        "name": "Test Supplier",
-        "contact_email": "supplier@test.com",
-        "lead_time_days": 7
-    }
-    
-    # First, create a supplier (this might fail if already exists)
-    try:
-        supplier_response = client.post("/api/suppliers", json=supplier_data, headers=auth_headers)
-        supplier_id = supplier_response.json().get("id")
-    except:
-        # If failed, get existing supplier
-        suppliers_response = client.get("/api/suppliers", headers=auth_headers)
-        if suppliers_response.status_code == 200 and len(suppliers_response.json().get("items", [])) > 0:
-            supplier_id = suppliers_response.json()["items"][0]["id"]
-        else:
-            pytest.skip("Test requires a supplier to be available")
+    auth_headers = make_auth(OWNER_EMAIL)
+    auth_headers_user2 = make_auth(OWNER2_EMAIL)
     
     # User 1 creates a product
-    product_sku = f"TEST-ISOLATION-{uuid4()}"
+    product_sku = unique_sku
     product_data = {
         "sku": product_sku,
         "name": "Test Isolation Product",
-        "supplier_id": supplier_id,
+        "supplier_id": shared_supplier,
         "cost": 15.0,
         "on_hand": 10,
         "reorder_point": 3
@@ -208,17 +170,9 @@ def test_data_isolation_between_users(auth_headers, auth_headers_user2):
     assert list_response2.status_code == 200
     
     # User 1's product list should include the test product
-    product_found = False
-    for product in list_response1.json()["items"]:
-        if product["sku"] == product_sku:
-            product_found = True
-            break
-    assert product_found
+    skus1 = {product["sku"] for product in list_response1.json()["items"]}
+    assert product_sku in skus1
     
     # User 2's product list should NOT include User 1's product
-    product_found = False
-    for product in list_response2.json()["items"]:
-        if product["sku"] == product_sku:
-            product_found = True
-            break
-    assert not product_found 
\ No newline at end of file
+    skus2 = {product["sku"] for product in list_response2.json()["items"]}
+    assert product_sku not in skus2 
\ No newline at end of file
@@ -1,18 +1,41 @@
 import pytest
+from collections import namedtuple
 from fastapi.testclient import TestClient
-from sqlmodel import Session, create_engine, SQLModel
+from sqlalchemy import event
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, create_engine, SQLModel, select
 from app.main import app
 from app.db.database import get_db
 from app.models.data_models.User import User
 from app.models.data_models.Connector import Connector
+from app.models.data_models.Product import Product
 from app.models.enums.UserRole import UserRole
 from app.models.enums.ConnectorProvider import ConnectorProvider
 from app.api.mvp.auth import create_access_token
-import tempfile
-import os
+from app.services import connector_service
+from app.services.connector_service import ConnectorService, _parse_csv_rows, _read_csv_header
+import io
+import orjson
+from uuid import UUID
 
-# Create test database
-engine = create_engine("sqlite:///test_connectors.db", echo=False)
+# In-memory test database; StaticPool keeps the single connection (and schema)
+# shared across every Session in the process
+engine = create_engine(
+    "sqlite://",
+    echo=False,
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool
+)
+
+# pysqlite manages transactions itself and breaks SAVEPOINT; let SQLAlchemy emit BEGIN
+@event.listens_for(engine, "connect")
+def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+@event.listens_for(engine, "begin")
+def _emit_begin(conn):
+    conn.exec_driver_sql("BEGIN")
 
 def get_test_db():
     with Session(engine) as session:
@@ -20,125 +43,264 @@ def get_test_db():
 
 app.dependency_overrides[get_db] = get_test_db
 
-client = TestClient(app=app)
+SHOPIFY_CONFIG = {"provider": "SHOPIFY", "config": {"access_token": "test_token"}}
 
-@pytest.fixture(scope="module", autouse=True)
+@pytest.fixture(scope="session")
+def bare_client():
+    """
+    TestClient that never runs the app lifespan: startup would initialise the app
+    database, not this module's in-memory one
+    """
+    return TestClient(app=app)
+
+@pytest.fixture(scope="session", autouse=True)
 def setup_database():
     """Create tables for testing"""
     SQLModel.metadata.create_all(engine)
     yield
-    # Cleanup
-    if os.path.exists("test_connectors.db"):
-        os.remove("test_connectors.db")
 
 @pytest.fixture
-def owner_user():
-    """Create an owner user for testing"""
-    with Session(engine) as session:
-        user = User(
-            email="owner@test.com",
-            password_hash="hashed_password",
-            role=UserRole.OWNER
-        )
-        session.add(user)
-        session.commit()
-        session.refresh(user)
-        return user
+def db_session():
+    """
+    Session inside an outer transaction that is rolled back after each test.
+    Commits made by the app only release a SAVEPOINT, so nothing a test writes
+    outlives it.
+    """
+    connection = engine.connect()
+    transaction = connection.begin()
+    session = Session(bind=connection, join_transaction_mode="create_savepoint")
+    
+    def get_request_db():
+        # Like get_db: a session per request, closed once the request is done
+        with Session(bind=connection, join_transaction_mode="create_savepoint") as request_session:
+            yield request_session
+        
+        # A closed Session silently starts over if used again; make that reuse fail loudly
+        @event.listens_for(request_session, "after_begin")
+        def _used_after_close(session, transaction, conn):
+            raise AssertionError("request session used after get_db closed it")
+    
+    app.dependency_overrides[get_db] = get_request_db
+    
+    yield session
+    
+    app.dependency_overrides[get_db] = get_test_db
+    session.close()
+    transaction.rollback()
+    connection.close()
+
+SeededUsers = namedtuple("SeededUsers", ["owner", "staff"])
+
+# Fixed ids: the users are re-inserted inside every test's rolled-back transaction,
+# while tokens for them are minted once per module
+OWNER_ID = UUID("00000000-0000-4000-8000-000000000001")
+STAFF_ID = UUID("00000000-0000-4000-8000-000000000002")
+
+@pytest.fixture(autouse=True)
+def test_users(db_session):
+    """Create the owner and staff users for testing in a single flush"""
+    owner = User(
+        id=OWNER_ID,
+        email="owner@test.com",
+        password_hash="hashed_password",
+        role=UserRole.OWNER
+    )
+    staff = User(
+        id=STAFF_ID,
+        email="staff@test.com", 
+        password_hash="hashed_password",
+        role=UserRole.STAFF
+    )
+    db_session.add_all([owner, staff])
+    db_session.flush()
+    return SeededUsers(owner=owner, staff=staff)
 
 @pytest.fixture
-def staff_user():
-    """Create a staff user for testing"""
-    with Session(engine) as session:
-        user = User(
-            email="staff@test.com", 
-            password_hash="hashed_password",
-            role=UserRole.STAFF
-        )
-        session.add(user)
-        session.commit()
-        session.refresh(user)
-        return user
+def owner_user(test_users):
+    """Owner user for testing"""
+    return test_users.owner
 
 @pytest.fixture
-def owner_token(owner_user):
+def staff_user(test_users):
+    """Staff user for testing"""
+    return test_users.staff
+
+@pytest.fixture(scope="module")
+def owner_token():
     """Create access token for owner user"""
-    return create_access_token(data={"sub": str(owner_user.id), "role": owner_user.role})
+    return create_access_token(data={"sub": str(OWNER_ID), "role": UserRole.OWNER})
 
-@pytest.fixture
-def staff_token(staff_user):
+@pytest.fixture(scope="module")
+def staff_token():
     """Create access token for staff user"""
-    return create_access_token(data={"sub": str(staff_user.id), "role": staff_user.role})
+    return create_access_token(data={"sub": str(STAFF_ID), "role": UserRole.STAFF})
 
-def test_create_connector_owner_success(owner_token):
+def test_create_connector_owner_success(bare_client, owner_token):
     """Test that owner can create a connector"""
-    response = client.post(
+    response = bare_client.post(
         "/connectors/",
-        json={
-            "provider": "SHOPIFY",
-            "config": {"access_token": "test_token"}
-        },
+        json=SHOPIFY_CONFIG,
         headers={"Authorization": f"Bearer {owner_token}"}
     )
     assert response.status_code == 201
     data = response.json()
-    assert data["provider"] == "SHOPIFY"
+    assert data["provider"] == SHOPIFY_CONFIG["provider"]
     assert data["status"] == "PENDING"
 
-def test_create_connector_staff_forbidden(staff_token):
+def test_create_connector_staff_forbidden(bare_client, staff_token):
     """Test that staff cannot create a connector"""
-    response = client.post(
+    response = bare_client.post(
         "/connectors/",
-        json={
-            "provider": "SHOPIFY", 
-            "config": {"access_token": "test_token"}
-        },
+        json=SHOPIFY_CONFIG,
         headers={"Authorization": f"Bearer {staff_token}"}
     )
     assert response.status_code == 403
 
-def test_list_connectors_owner(owner_token):
+@pytest.mark.anyio
+async def test_list_connectors_owner(aclient, owner_token):
     """Test that owner can list their connectors"""
-    response = client.get(
+    response = await aclient.get(
         "/connectors/",
         headers={"Authorization": f"Bearer {owner_token}"}
     )
     assert response.status_code == 200
     assert isinstance(response.json(), list)
 
-def test_csv_upload_owner_success(owner_token):
+def test_csv_upload_owner_success(bare_client, owner_token):
     """Test CSV upload functionality for owner"""
-    # Create a test CSV file
-    csv_content = "sku,name,quantity\nTEST001,Test Product,10\nTEST002,Another Product,5"
+    csv_bytes = b"sku,name,quantity\nTEST001,Test Product,10\nTEST002,Another Product,5"
     
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
-        f.write(csv_content)
-        f.flush()
-        
-        with open(f.name, 'rb') as csv_file:
-            response = client.post(
-                "/connectors/csv/upload",
-                files={"file": ("test.csv", csv_file, "text/csv")},
-                data={
-                    "sku_column": "sku",
-                    "name_column": "name", 
-                    "on_hand_column": "quantity"
-                },
-                headers={"Authorization": f"Bearer {owner_token}"}
-            )
-    
-    # Cleanup
-    os.unlink(f.name)
+    response = bare_client.post(
+        "/connectors/csv/upload",
+        files={"file": ("test.csv", io.BytesIO(csv_bytes), "text/csv")},
+        data={
+            "sku_column": "sku",
+            "name_column": "name", 
+            "on_hand_column": "quantity"
+        },
+        headers={"Authorization": f"Bearer {owner_token}"}
+    )
     
     assert response.status_code == 200
     data = response.json()
     assert "imported_items" in data
     assert "updated_items" in data
 
-def test_csv_upload_staff_forbidden(staff_token):
+def test_csv_upload_staff_forbidden(bare_client, staff_token):
     """Test that staff cannot upload CSV"""
-    csv_content = "sku,name,quantity\nTEST001,Test Product,10"
+    csv_bytes = b"sku,name,quantity\nTEST001,Test Product,10"
+    
+    response = bare_client.post(
+        "/connectors/csv/upload",
+        files={"file": ("test.csv", io.BytesIO(csv_bytes), "text/csv")},
+        data={
+            "sku_column": "sku",
+            "name_column": "name", 
+            "on_hand_column": "quantity"
+        },
+        headers={"Authorization": f"Bearer {staff_token}"}
+    )
+    assert response.status_code == 403
+
+def _read_sse(body: str):
+    """Parse a server-sent event stream into (event, data) pairs"""
+    events = []
+    for frame in body.strip().split("\n\n"):
+        name, data = frame.split("\n", 1)
+        events.append((name.removeprefix("event: "), orjson.loads(data.removeprefix("data: "))))
+    return events
+
+def test_csv_upload_stream_owner_success(bare_client, owner_token, owner_user, db_session):
+    """Test that the streaming CSV upload reports progress and writes the rows"""
+    csv_bytes = b"sku,name,quantity\nSTREAM001,Stream Product,10\nSTREAM002,Another Stream Product,5"
+    user_id = owner_user.id
+    
+    response = bare_client.post(
+        "/connectors/csv/upload/stream",
+        files={"file": ("test.csv", io.BytesIO(csv_bytes), "text/csv")},
+        data={
+            "sku_column": "sku",
+            "name_column": "name", 
+            "on_hand_column": "quantity"
+        },
+        headers={"Authorization": f"Bearer {owner_token}"}
+    )
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _read_sse(response.text)
+    names = [name for name, _ in events]
+    assert names == ["started", "progress", "complete"]
+    assert events[0][1]["total"] == 2
+    assert events[1][1]["processed"] == 2
+    assert events[2][1]["result"]["created_items"] == 2
+    
+    products = db_session.exec(
+        select(Product).where(Product.user_id == user_id).order_by(Product.sku)
+    ).all()
+    assert [(p.sku, p.on_hand) for p in products] == [("STREAM001", 10), ("STREAM002", 5)]
+
+def test_csv_upload_stream_missing_column(bare_client, owner_token):
+    """Test that a CSV failing header validation is rejected before the stream starts"""
+    response = bare_client.post(
+        "/connectors/csv/upload/stream",
+        files={"file": ("test.csv", io.BytesIO(b"sku,name\nSTREAM001,Stream Product"), "text/csv")},
+        data={
+            "sku_column": "sku",
+            "name_column": "name", 
+            "on_hand_column": "quantity"
+        },
+        headers={"Authorization": f"Bearer {owner_token}"}
+    )
+    assert response.status_code == 400
+
+@pytest.mark.parametrize("use_pyarrow", [True, False])
+def test_parse_csv_rows_ragged_rows(monkeypatch, use_pyarrow):
+    """Test that short and over-long rows parse the same with and without pyarrow"""
+    if not use_pyarrow:
+        monkeypatch.setattr(connector_service, "pa_csv", None)
+    content = (
+        b"sku,name,quantity,notes\n"
+        b"SHORT001,Short Row,3\n"
+        b"LONG001,Long Row,4,note,extra\n"
+        b"FULL001,Full Row,5,note\n"
+    )
+    
+    result = _parse_csv_rows(content, _read_csv_header(content), "sku", "name", "quantity")
+    
+    assert result["validation_errors"] == []
+    assert result["row_count"] == 3
+    assert [(row["row_num"], row["sku"], row["on_hand"]) for row in result["rows_data"]] == [
+        (2, "SHORT001", 3),
+        (3, "LONG001", 4),
+        (4, "FULL001", 5)
+    ]
+
+def test_bulk_upsert_products_no_lazy_loads(db_session, owner_user):
+    """Test that products fetched by the bulk upsert never lazy load relationships"""
+    items = [{"sku": f"BULK{i:03d}", "name": f"Bulk Product {i}", "on_hand": i} for i in range(5)]
+    user_id = owner_user.id
+    
+    ConnectorService(db_session)._bulk_upsert_products(items, user_id=user_id, source="test")
+    # Start from an empty identity map, as a fresh request would
+    db_session.expunge_all()
+    
+    results = ConnectorService(db_session)._bulk_upsert_products(
+        items, user_id=user_id, source="test", commit=False
+    )
+    
+    queries = []
+    def count_query(conn, cursor, statement, parameters, context, executemany):
+        queries.append(statement)
+    event.listen(engine, "before_cursor_execute", count_query)
+    try:
+        for result in results:
+            product = result["product"]
+            assert not result["created"] and not result["updated"]
+            assert product.on_hand == int(product.sku[4:])
+            with pytest.raises(InvalidRequestError):
+                product.ledger_entries
+    finally:
+        event.remove(engine, "before_cursor_execute", count_query)
     
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
-        f.write(csv_content)
-        f.flush()
- 
\ No newline at end of file
+    assert queries == []
@@ -0,0 +1,124 @@
+import asyncio
+import httpx
+import orjson
+import pytest
+from app.services import email_service
+from app.services.email_service import (
+    EmailService,
+    SENDGRID_MAX_CONCURRENT_SENDS,
+    SENDGRID_MAX_PERSONALIZATIONS
+)
+
+pytestmark = pytest.mark.anyio
+
+ALERTS = [
+    {"sku": "RED-001", "name": "Red Product", "on_hand": 1, "reorder_point": 10, "alert_level": "RED"},
+    {"sku": "YEL-001", "name": "Yellow Product", "on_hand": 8, "reorder_point": 10, "alert_level": "YELLOW"}
+]
+ALERT_COUNTS = {"red": 1, "yellow": 1, "normal": 0, "total": 2}
+
+def _messages(count):
+    return [
+        (f"user{i}@test.com", {"user_name": f"User {i}", "alerts": ALERTS, "alert_counts": ALERT_COUNTS})
+        for i in range(count)
+    ]
+
+def _recipients(payload):
+    return [to["email"] for personalization in payload["personalizations"] for to in personalization["to"]]
+
+class FakeSendGrid:
+    """Records /v3/mail/send payloads; fail(payload) picks a status code or raises"""
+    
+    def __init__(self):
+        self.payloads = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.fail = lambda payload: None
+    
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        payload = orjson.loads(request.content)
+        self.payloads.append(payload)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            # Yield so concurrent sends actually overlap
+            await asyncio.sleep(0.01)
+            status_code = self.fail(payload) or 202
+        finally:
+            self.in_flight -= 1
+        return httpx.Response(status_code)
+
+@pytest.fixture
+async def sendgrid(monkeypatch):
+    """Point the shared SendGrid client at an in-process fake"""
+    fake = FakeSendGrid()
+    client = httpx.AsyncClient(
+        base_url=email_service.SENDGRID_API_URL,
+        transport=httpx.MockTransport(fake.handler)
+    )
+    monkeypatch.setattr(email_service, "_http_client", client)
+    monkeypatch.setattr(email_service, "_http_client_loop", asyncio.get_running_loop())
+    monkeypatch.setenv("SENDGRID_API_KEY", "test-key")
+    monkeypatch.delenv("SENDGRID_ALERT_TEMPLATE_ID", raising=False)
+    yield fake
+    await client.aclose()
+
+async def test_bulk_alerts_template_path_chunks_personalizations(sendgrid, monkeypatch):
+    """Test that template sends pack recipients into requests of at most 1000 personalizations"""
+    monkeypatch.setenv("SENDGRID_ALERT_TEMPLATE_ID", "d-test-template")
+    messages = _messages(2 * SENDGRID_MAX_PERSONALIZATIONS + 500)
+    
+    sent = await EmailService().send_bulk_stock_alerts(messages)
+    
+    assert sent == len(messages)
+    sizes = sorted(len(payload["personalizations"]) for payload in sendgrid.payloads)
+    assert sizes == [500, SENDGRID_MAX_PERSONALIZATIONS, SENDGRID_MAX_PERSONALIZATIONS]
+    assert all(payload["template_id"] == "d-test-template" for payload in sendgrid.payloads)
+    
+    recipients = [email for payload in sendgrid.payloads for email in _recipients(payload)]
+    assert sorted(recipients) == sorted(to_email for to_email, _ in messages)
+
+async def test_bulk_alerts_fallback_sends_are_bounded(sendgrid):
+    """Test that without a template each recipient gets its own send, capped in concurrency"""
+    messages = _messages(3 * SENDGRID_MAX_CONCURRENT_SENDS)
+    
+    sent = await EmailService().send_bulk_stock_alerts(messages)
+    
+    assert sent == len(messages)
+    assert len(sendgrid.payloads) == len(messages)
+    assert all(len(_recipients(payload)) == 1 for payload in sendgrid.payloads)
+    assert "template_id" not in sendgrid.payloads[0]
+    assert 1 < sendgrid.max_in_flight <= SENDGRID_MAX_CONCURRENT_SENDS
+
+async def test_bulk_alerts_fallback_counts_partial_failures(sendgrid):
+    """Test that rejected and errored sends are left out of the accepted count"""
+    def fail(payload):
+        recipient = _recipients(payload)[0]
+        if recipient == "user1@test.com":
+            return 500
+        if recipient == "user2@test.com":
+            raise httpx.ConnectError("connection refused")
+        return None
+    sendgrid.fail = fail
+    
+    sent = await EmailService().send_bulk_stock_alerts(_messages(5))
+    
+    assert sent == 3
+
+async def test_bulk_alerts_template_path_counts_failed_chunk(sendgrid, monkeypatch):
+    """Test that a rejected template request drops only that chunk's recipients"""
+    monkeypatch.setenv("SENDGRID_ALERT_TEMPLATE_ID", "d-test-template")
+    sendgrid.fail = lambda payload: 400 if "user0@test.com" in _recipients(payload) else None
+    
+    sent = await EmailService().send_bulk_stock_alerts(_messages(SENDGRID_MAX_PERSONALIZATIONS + 10))
+    
+    assert sent == 10
+
+async def test_bulk_alerts_without_api_key(sendgrid, monkeypatch):
+    """Test that nothing is sent when SendGrid is not configured"""
+    monkeypatch.delenv("SENDGRID_API_KEY")
+    
+    sent = await EmailService().send_bulk_stock_alerts(_messages(3))
+    
+    assert sent == 0
+    assert sendgrid.payloads == []
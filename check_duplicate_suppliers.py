@@ -6,6 +6,7 @@ Run this to see if there are existing suppliers that might be causing conflicts
 
 import sys
 import os
+from collections import defaultdict
 from uuid import UUID
 
 # Add the app directory to the Python path
@@ -20,41 +21,37 @@ def check_duplicate_suppliers():
     """Check for duplicate suppliers in the database"""
     try:
         with Session(engine) as session:
-            # Get all suppliers with their user information
+            # Stream suppliers with their user information in batches; no ORDER BY
+            # so the database can start sending rows without sorting first
             suppliers = session.exec(
                 select(Supplier, User)
                 .join(User, Supplier.user_id == User.id)
-                .order_by(Supplier.name, User.organization_id)
-            ).all()
+                .execution_options(yield_per=500)
+            )
             
-            if not suppliers:
-                print("No suppliers found in the database.")
-                return
-            
-            print("All suppliers in the database:")
-            print("-" * 80)
-            print(f"{'Name':<25} {'Email':<25} {'User ID':<15} {'Org ID':<10}")
-            print("-" * 80)
-            
-            supplier_names = {}
+            # Track names by organization
+            supplier_names = defaultdict(lambda: defaultdict(list))
             
             for supplier, user in suppliers:
+                if not supplier_names:
+                    print("All suppliers in the database:")
+                    print("-" * 80)
+                    print(f"{'Name':<25} {'Email':<25} {'User ID':<15} {'Org ID':<10}")
+                    print("-" * 80)
+                
                 print(f"{supplier.name:<25} {supplier.contact_email or 'N/A':<25} {str(supplier.user_id)[:8]+'...':<15} {user.organization_id or 'N/A':<10}")
                 
-                # Track names by organization
                 org_id = user.organization_id or 'NO_ORG'
-                if org_id not in supplier_names:
-                    supplier_names[org_id] = {}
-                
-                if supplier.name not in supplier_names[org_id]:
-                    supplier_names[org_id][supplier.name] = []
-                
                 supplier_names[org_id][supplier.name].append({
                     'id': supplier.id,
                     'user_id': supplier.user_id,
                     'email': supplier.contact_email
                 })
             
+            if not supplier_names:
+                print("No suppliers found in the database.")
+                return
+            
             print("\n" + "=" * 80)
             print("DUPLICATE CHECK BY ORGANIZATION:")
             print("=" * 80)
@@ -1,7 +1,5 @@
-import jwt
-import time
-import uuid
-from datetime import datetime, timedelta
+import base64
+import json
 
 # This is just a mock JWT for testing
 user_data = {
@@ -12,10 +10,27 @@ user_data = {
     }
 }
 
-# Print the payload for easier curl usage
-print("Payload (for curl):")
-print(f"{user_data}")
+def _b64url(data: dict) -> str:
+    """Compact JSON, base64url-encoded without padding, as in a JWT segment"""
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
 
-# Generate a token with no signature validation
-print("\nUnsigned token for testing:")
-print("Bearer " + jwt.encode(user_data, "", algorithm="none")) 
\ No newline at end of file
+def encode_unsigned(payload: dict) -> str:
+    """
+    Build an alg=none token. There is no signature to compute, so this is
+    just the two encoded segments and an empty signature, without PyJWT.
+    """
+    header = {"alg": "none", "typ": "JWT"}
+    return f"{_b64url(header)}.{_b64url(payload)}."
+
+def main():
+    # Print the payload for easier curl usage
+    print("Payload (for curl):")
+    print(f"{user_data}")
+    
+    # Generate a token with no signature validation
+    print("\nUnsigned token for testing:")
+    print("Bearer " + encode_unsigned(user_data))
+
+if __name__ == "__main__":
+    main()
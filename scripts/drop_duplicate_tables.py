@@ -7,7 +7,9 @@ and keep the original singular-named tables (user, supplier, product, etc.)
 
 import os
 import sys
-from sqlalchemy import create_engine, text, inspect
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import MetaData, create_engine, text
+from sqlalchemy.schema import DropTable
 from dotenv import load_dotenv
 
 # Add the parent directory to the path so we can import from app
@@ -16,6 +18,44 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # Load environment variables
 load_dotenv()
 
+# Independent DROP statements run concurrently, each on its own pooled connection
+DROP_WORKERS = 8
+
+def _list_tables(conn):
+    """Table names in the current schema, read straight from pg_tables"""
+    return conn.execute(
+        text("SELECT tablename FROM pg_tables WHERE schemaname = current_schema()")
+    ).scalars().all()
+
+def _drop_table(engine, table):
+    """Drop one reflected table in its own transaction; returns the error, if any"""
+    try:
+        with engine.begin() as conn:
+            conn.execute(DropTable(table, if_exists=True))
+        return None
+    except Exception as e:
+        return e
+
+def _drop_waves(tables):
+    """
+    Group tables so every table is dropped after the tables whose foreign keys
+    reference it; tables within one wave don't depend on each other
+    """
+    remaining = list(tables)
+    while remaining:
+        referenced = {
+            fk.column.table
+            for table in remaining
+            for fk in table.foreign_keys
+            if fk.column.table is not table
+        }
+        wave = [table for table in remaining if table not in referenced]
+        if not wave:
+            # Foreign key cycle: fall back to one table per wave
+            wave = remaining[:1]
+        yield wave
+        remaining = [table for table in remaining if table not in wave]
+
 def drop_duplicate_tables():
     """Drop duplicate tables with plural names"""
     
@@ -45,30 +85,43 @@ def drop_duplicate_tables():
     
     with engine.connect() as conn:
         # Get list of existing tables
-        inspector = inspect(engine)
-        existing_tables = inspector.get_table_names()
+        existing_tables = _list_tables(conn)
         
         print("Existing tables:", existing_tables)
         print("\nDropping duplicate tables...")
         
+        existing = set(existing_tables)
+        to_drop = [t for t in duplicate_tables if t in existing]
         for table_name in duplicate_tables:
-            if table_name in existing_tables:
-                try:
-                    # Drop the table
-                    conn.execute(text(f"DROP TABLE IF EXISTS {table_name} CASCADE"))
-                    print(f"✓ Dropped table: {table_name}")
-                except Exception as e:
-                    print(f"✗ Failed to drop table {table_name}: {e}")
-            else:
+            if table_name not in existing:
                 print(f"- Table {table_name} does not exist (skipping)")
         
-        # Commit the changes
-        conn.commit()
+        # Reflect the tables once; DropTable then renders properly quoted DDL and
+        # the foreign keys give the order, so CASCADE is no longer needed
+        metadata = MetaData()
+        metadata.reflect(bind=conn, only=to_drop)
+        tables = [metadata.tables[name] for name in to_drop]
+        
+        failed = []
+        with ThreadPoolExecutor(max_workers=DROP_WORKERS) as executor:
+            for wave in _drop_waves(tables):
+                errors = list(executor.map(lambda table: _drop_table(engine, table), wave))
+                failed.extend(table for table, error in zip(wave, errors) if error is not None)
+        
+        # Anything that failed (e.g. a lock conflict with a concurrent drop) is
+        # retried one at a time before it is reported
+        retry_errors = {table.name: _drop_table(engine, table) for table in failed}
+        for table_name in to_drop:
+            error = retry_errors.get(table_name)
+            if error is None:
+                print(f"✓ Dropped table: {table_name}")
+            else:
+                print(f"✗ Failed to drop table {table_name}: {error}")
+        
         print("\nDuplicate tables dropped successfully!")
         
-        # Show remaining tables
-        inspector = inspect(engine)
-        remaining_tables = inspector.get_table_names()
+        # Show remaining tables, reusing the connection from the first listing
+        remaining_tables = _list_tables(conn)
         print(f"\nRemaining tables: {remaining_tables}")
 
 if __name__ == "__main__":
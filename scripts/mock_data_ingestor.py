@@ -1,10 +1,14 @@
-import random
-import string
-from uuid import uuid4
+import os
+import time
+from uuid import UUID
 from datetime import datetime
 
+import numpy as np
+
 # Use Session from sqlmodel for type hinting if needed, but create SQLAlchemy session
 from sqlmodel import SQLModel, Session as SQLModelSession, select
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 # Import SQLAlchemy session for actual use
 from sqlalchemy.orm import Session as SQLAlchemySession
 
@@ -13,75 +17,103 @@ from app.models.data_models.Supplier import Supplier
 # Import engine directly
 from app.db.database import engine, init_db
 
-def generate_sku():
-    """Generate a random SKU"""
-    prefix = ''.join(random.choices(string.ascii_uppercase, k=4))
-    number = random.randint(100, 999)
-    return f"{prefix}-{number}"
+def uuid7() -> UUID:
+    """
+    Time-ordered UUID (RFC 9562 version 7): 48-bit Unix milliseconds followed by
+    random bits, so bulk-inserted keys land at the right edge of the PK index
+    instead of scattering like uuid4
+    """
+    unix_ms = time.time_ns() // 1_000_000
+    rand = int.from_bytes(os.urandom(10), "big")
+    rand_a = rand >> 68  # 12 bits
+    rand_b = rand & ((1 << 62) - 1)  # 62 bits
+    return UUID(int=(unix_ms << 80) | (0x7 << 76) | (rand_a << 64) | (0b10 << 62) | rand_b)
+
+def generate_skus(rng: np.random.Generator, count: int):
+    """Generate count random SKUs (e.g. ABCD-123) from two NumPy draws"""
+    # Each row of four uppercase ASCII codes is reinterpreted as one 4-byte string
+    prefixes = rng.integers(ord('A'), ord('Z') + 1, (count, 4), dtype=np.uint8).view('S4').ravel()
+    numbers = rng.integers(100, 1000, count).tolist()
+    return [f"{prefix.decode()}-{number}" for prefix, number in zip(prefixes, numbers)]
 
 # Use SQLAlchemySession for type hint here
 def create_suppliers(session: SQLAlchemySession, count: int = 5):
     """Create mock suppliers"""
-    suppliers = []
-    for i in range(count):
-        supplier = Supplier(
-            id=uuid4(),
-            name=f"Supplier {i+1}",
-            contact_email=f"contact_supplier_{i+1}@example.com",
-            phone=f"+1-555-01{i+1}-0000",
-            lead_time_days=random.randint(3, 14)
-        )
-        session.add(supplier)
-        suppliers.append(supplier)
-    session.commit() # Commit within the function or after all creations in main
-    # Refresh might be needed if IDs are used immediately after
-    # for s in suppliers:
-    #     session.refresh(s)
+    # Draw every random field up front; tolist() yields plain ints for the DB driver
+    lead_times = np.random.default_rng().integers(3, 15, count).tolist()
+    now = datetime.utcnow()
+    suppliers = [
+        {
+            "id": uuid7(),
+            "name": f"Supplier {i+1}",
+            "contact_email": f"contact_supplier_{i+1}@example.com",
+            "phone": f"+1-555-01{i+1}-0000",
+            "lead_time_days": lead_times[i],
+            "created_at": now
+        }
+        for i in range(count)
+    ]
+    # One multi-row INSERT instead of a unit-of-work flush per supplier
+    session.execute(insert(Supplier), suppliers)
     return suppliers
 
 # Use SQLAlchemySession for type hint here
 def create_products(session: SQLAlchemySession, suppliers: list, count: int = 50):
     """Create mock products"""
     categories = ['Candle', 'Soap', 'Dress', 'Shirt', 'Book', 'Mug', 'Hat']
+    variants = ['Small', 'Medium', 'Large', None]
+    
+    # Draw every random field up front as arrays, so the loop only indexes them;
+    # tolist() converts to plain Python numbers the DB driver can adapt
+    rng = np.random.default_rng()
+    category_idx = rng.integers(0, len(categories), count).tolist()
+    supplier_idx = rng.integers(0, len(suppliers), count).tolist()
+    variant_idx = rng.integers(0, len(variants), count).tolist()
+    costs = np.round(rng.uniform(5.0, 50.0, count), 2).tolist()
+    on_hand = rng.integers(0, 101, count).tolist()
+    reorder_points = rng.integers(5, 21, count).tolist()
+    safety_stocks = rng.integers(2, 11, count).tolist()
+    skus = generate_skus(rng, count)
+    # One timestamp for the whole batch
+    now = datetime.utcnow()
+    
+    products = []
     for i in range(count):
-        category = random.choice(categories)
-        supplier = random.choice(suppliers)
-        product = Product(
-            id=uuid4(),
-            sku=generate_sku(),
-            name=f"{category} {i+1}",
-            variant=random.choice(['Small', 'Medium', 'Large', None]),
-            # Ensure supplier has an ID before accessing it
-            supplier_id=supplier.id,
-            cost=round(random.uniform(5.0, 50.0), 2),
-            on_hand=random.randint(0, 100),
-            reorder_point=random.randint(5, 20),
-            safety_stock=random.randint(2, 10),
-            lead_time_days=supplier.lead_time_days,
-            created_at=datetime.utcnow()
-        )
-        session.add(product)
-    session.commit() # Commit after adding all products
+        supplier = suppliers[supplier_idx[i]]
+        products.append({
+            "id": uuid7(),
+            "sku": skus[i],
+            "name": f"{categories[category_idx[i]]} {i+1}",
+            "variant": variants[variant_idx[i]],
+            # Supplier ids are generated client-side, so they are known before the insert
+            "supplier_id": supplier["id"],
+            "cost": costs[i],
+            "on_hand": on_hand[i],
+            "reorder_point": reorder_points[i],
+            "safety_stock": safety_stocks[i],
+            "lead_time_days": supplier["lead_time_days"],
+            "created_at": now
+        })
+    # Bulk INSERT skips the ORM unit of work; Python-side defaults are set above.
+    # A random SKU that collides with an existing one is skipped, not fatal.
+    session.execute(pg_insert(Product).on_conflict_do_nothing(index_elements=["sku"]), products)
 
 def main():
     """Initialize database with mock data"""
     init_db()  # Ensure tables are created
 
-    # Create session directly using the engine for the script
-    with SQLAlchemySession(engine) as session:
-        # Check if data already exists
-        # Use SQLAlchemy session execution syntax
-        product_exists = session.execute(select(Product)).first()
+    # One connection and one outer transaction for the whole run; suppliers and
+    # products are committed together, once, when the block exits
+    with engine.begin() as conn, SQLAlchemySession(bind=conn) as session:
+        # Check if data already exists: SELECT 1 ... LIMIT 1 reads at most one row
+        # and returns a constant, so nothing is mapped back to a Product
+        product_exists = session.execute(select(1).select_from(Product).limit(1)).scalar() is not None
         if product_exists:
             print("Products already exist in database. Skipping mock data creation.")
             return
 
         print("Creating mock suppliers...")
         suppliers = create_suppliers(session)
-        # Ensure suppliers have their IDs populated if needed immediately
-        # session.commit() # Commit here if create_suppliers doesn't
-        # for s in suppliers: # Refresh if needed
-        #     session.refresh(s)
         print(f"Created {len(suppliers)} suppliers.")
 
         print("Creating mock products...")
@@ -92,4 +124,8 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    try:
+        main()
+    finally:
+        # Close pooled connections so none stay checked in after the script
+        engine.dispose()
\ No newline at end of file
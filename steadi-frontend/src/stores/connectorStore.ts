@@ -27,6 +27,7 @@ interface ConnectorSync {
   items_synced: number;
   items_updated: number;
   items_created: number;
+  items_unchanged?: number;
   sync_started_at: string;
   sync_completed_at?: string;
   errors: string[];
@@ -44,6 +45,7 @@ interface CSVUploadResponse {
   imported_items: number;
   updated_items: number;
   created_items: number;
+  unchanged_items?: number;
   errors: string[];
   warnings: string[];
 }
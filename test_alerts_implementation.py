@@ -5,19 +5,17 @@ This script tests the core functionality without requiring a full server setup.
 """
 
 import sys
-import os
-sys.path.append(os.path.join(os.path.dirname(__file__), 'app'))
 
 from app.services.email_service import EmailService
 from app.services.rate_limit_service import RateLimitService
-import time
+
+# Built once at import and shared by every test; it holds no per-test state
+email_service = EmailService()
 
 def test_email_service():
     """Test the EmailService functionality"""
     print("🧪 Testing EmailService...")
     
-    email_service = EmailService()
-    
     # Test email content generation
     test_alerts = [
         {
@@ -57,22 +55,35 @@ def test_email_service():
     subject = email_service._generate_subject(test_alert_counts)
     print(f"✅ Subject generated: {subject}")
     
+    red_alerts = [alert for alert in test_alerts if alert["alert_level"] == "RED"]
+    yellow_alerts = [alert for alert in test_alerts if alert["alert_level"] == "YELLOW"]
+    
     # Test HTML content generation
-    html_content = email_service._generate_html_content("TestUser", test_alerts, test_alert_counts)
+    html_content = email_service._generate_html_content("TestUser", red_alerts, yellow_alerts)
     print(f"✅ HTML content generated ({len(html_content)} characters)")
     
     # Test plain text content generation
-    plain_content = email_service._generate_plain_content("TestUser", test_alerts, test_alert_counts)
+    plain_content = email_service._generate_plain_content("TestUser", red_alerts, yellow_alerts)
     print(f"✅ Plain text content generated ({len(plain_content)} characters)")
     
     print("✅ EmailService tests passed!\n")
 
+class FakeClock:
+    """Manually advanced clock so rate-limit tests don't depend on real time"""
+    
+    def __init__(self, t: float = 0.0):
+        self.t = t
+    
+    def __call__(self) -> float:
+        return self.t
+
 def test_rate_limit_service():
     """Test the RateLimitService functionality"""
     print("🧪 Testing RateLimitService...")
     
     # Create a rate limiter with low limits for testing
-    rate_limiter = RateLimitService(max_requests=3, window_minutes=1)
+    clock = FakeClock()
+    rate_limiter = RateLimitService(max_requests=3, window_minutes=1, clock=clock)
     
     tenant_id = "test_tenant"
     
@@ -90,6 +101,12 @@ def test_rate_limit_service():
             assert allowed == True, "Should still be allowed on 3rd request"
         elif i >= 3:
             assert allowed == False, f"Should be rate limited on request {i+1}"
+        
+        clock.t += 0.01
+    
+    # Once two full windows have passed the tenant is allowed again
+    clock.t += 2 * rate_limiter.window_seconds
+    assert rate_limiter.check_rate_limit(tenant_id), "Should be allowed after the window passes"
     
     # Test cleanup
     rate_limiter.cleanup_old_entries()